@@ -0,0 +1,119 @@
+import logging
+from typing import Dict, Iterable, List, Optional
+
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# Employee fields the org-wide statistics are derived from
+STATS_PROJECTION = {"gender": 1, "department": 1, "skills": 1}
+
+def empty_stats() -> Dict:
+    """Org-wide employee statistics, as produced by compute_org_stats.
+
+    ``skills`` is the inverted skill index (lowercased skill name to the
+    number of employees with it). It is built once per snapshot and shared
+    by skill coverage and gap analysis.
+    """
+    return {
+        "total_employees": 0,
+        "gender": {},
+        "seniority": {},
+        "department": {},
+        "skills": {},
+    }
+
+def add_employee(stats: Dict, emp: Dict, sign: int = 1, skills: Optional[Iterable[str]] = None) -> Dict:
+    """Fold one employee into ``stats`` (``sign=-1`` removes it)"""
+    def bump(dist, key):
+        dist[key] = dist.get(key, 0) + sign
+
+    stats["total_employees"] += sign
+    bump(stats["gender"], (emp.get("gender") or "other").lower())
+    department = emp.get("department")
+    bump(stats["department"], "Unknown" if department is None else department)
+    for skill in emp.get("skills") or []:
+        level = (skill.get("level") or "").lower()
+        if level:
+            bump(stats["seniority"], level)
+    # Each employee counts at most once per skill
+    for name in {s.get("name", "").lower() for s in emp.get("skills") or []}:
+        if name and (skills is None or name in skills):
+            bump(stats["skills"], name)
+    return stats
+
+def org_stats_pipeline(skills: Optional[List[str]] = None) -> List[Dict]:
+    """Aggregation computing every distribution server-side in one $facet"""
+    skill_facet = [
+        {"$project": {"names": {"$setUnion": [
+            {"$map": {
+                "input": "$skills",
+                "as": "s",
+                "in": {"$toLower": {"$ifNull": ["$$s.name", ""]}},
+            }},
+            [],
+        ]}}},
+        {"$unwind": "$names"},
+        {"$match": {"names": {"$ne": ""}}},
+    ]
+    if skills is not None:
+        skill_facet.append({"$match": {"names": {"$in": list(skills)}}})
+    skill_facet.append({"$group": {"_id": "$names", "n": {"$sum": 1}}})
+
+    return [
+        {"$project": {
+            "gender": {"$toLower": {"$ifNull": ["$gender", "other"]}},
+            "department": {"$ifNull": ["$department", "Unknown"]},
+            "skills": {"$ifNull": ["$skills", []]},
+        }},
+        {"$facet": {
+            "total": [{"$count": "n"}],
+            # "skills" builds the inverted skill index server-side
+            "gender": [{"$group": {"_id": "$gender", "n": {"$sum": 1}}}],
+            "department": [{"$group": {"_id": "$department", "n": {"$sum": 1}}}],
+            "seniority": [
+                {"$unwind": "$skills"},
+                {"$group": {"_id": {"$toLower": {"$ifNull": ["$skills.level", ""]}}, "n": {"$sum": 1}}},
+            ],
+            "skills": skill_facet,
+        }},
+    ]
+
+def parse_org_stats(facets: Dict) -> Dict:
+    """Turn the single $facet result document into a stats dict"""
+    stats = empty_stats()
+    total = facets.get("total") or []
+    stats["total_employees"] = total[0]["n"] if total else 0
+    for row in facets.get("gender", []):
+        key = row["_id"] or "other"
+        stats["gender"][key] = stats["gender"].get(key, 0) + row["n"]
+    for row in facets.get("department", []):
+        stats["department"][row["_id"]] = row["n"]
+    for row in facets.get("seniority", []):
+        if row["_id"]:
+            stats["seniority"][row["_id"]] = row["n"]
+    for row in facets.get("skills", []):
+        stats["skills"][row["_id"]] = row["n"]
+    return stats
+
+async def compute_org_stats(db_employees, skills: Optional[List[str]] = None) -> Dict:
+    """Compute org-wide employee statistics for any collection size.
+
+    ``skills`` limits the per-skill counts to the given lowercased names.
+    Falls back to streaming a projected cursor when the driver reports any
+    error for the ``$facet`` pipeline; either way only one employee is held
+    in memory at a time. Errors that are not driver errors propagate.
+    """
+    try:
+        cursor = db_employees.aggregate(org_stats_pipeline(skills), allowDiskUse=True)
+        facets = await cursor.to_list(1)
+        if facets:
+            return parse_org_stats(facets[0])
+    except PyMongoError:
+        logger.warning("Org stats pipeline failed; folding the cursor in Python", exc_info=True)
+
+    wanted = set(skills) if skills is not None else None
+    stats = empty_stats()
+    async for emp in db_employees.find({}, STATS_PROJECTION):
+        add_employee(stats, emp, skills=wanted)
+    return stats
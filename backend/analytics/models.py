@@ -27,6 +27,16 @@ class SkillGapAnalysis(BaseModel):
     training_recommendations: List[str]
     hiring_recommendations: List[str]
 
+class ProjectSkillGaps(SkillGapAnalysis):
+    project_id: str
+    project_name: str
+    coverage_percentage: float
+
+class BatchSkillGapAnalysis(BaseModel):
+    projects: List[ProjectSkillGaps]
+    total_employees: int
+    next_cursor: Optional[str] = None
+
 class PerformanceMetrics(BaseModel):
     optimization_success_rate: float
     average_team_score: float
@@ -34,6 +44,9 @@ class PerformanceMetrics(BaseModel):
     diversity_score: float
     total_optimizations: int
     successful_optimizations: int
+    window: str = "all"
+    average_latency_ms: float = 0.0
+    stage_latency_ms: Dict[str, float] = {}
 
 class AnalyticsSummary(BaseModel):
     team_analytics: TeamAnalytics
@@ -0,0 +1,96 @@
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+from pymongo import ReturnDocument
+
+from .aggregations import add_employee, compute_org_stats, empty_stats
+
+ROLLUP_COLLECTION = "analytics_rollups"
+ROLLUP_ID = "org"
+RECONCILE_INTERVAL_SECONDS = float(os.getenv("ANALYTICS_ROLLUP_RECONCILE_SECONDS", "3600"))
+
+DISTRIBUTIONS = ("gender", "seniority", "department", "skills")
+
+def encode_key(key) -> str:
+    """Escape a value for use as a MongoDB field name (e.g. 'node.js')"""
+    encoded = str(key).replace("%", "%25").replace(".", "%2E").replace("$", "%24")
+    return encoded or "%00"
+
+def decode_key(key: str) -> str:
+    if key == "%00":
+        return ""
+    return key.replace("%24", "$").replace("%2E", ".").replace("%25", "%")
+
+def rollup_increments(delta: Dict) -> Dict[str, int]:
+    """Flatten a stats delta into ``$inc`` paths, dropping zero entries"""
+    increments = {}
+    if delta["total_employees"]:
+        increments["total_employees"] = delta["total_employees"]
+    for dist in DISTRIBUTIONS:
+        for key, count in delta[dist].items():
+            if count:
+                increments[f"{dist}.{encode_key(key)}"] = count
+    return increments
+
+def _decode_rollup(doc: Dict) -> Dict:
+    stats = empty_stats()
+    stats["total_employees"] = doc.get("total_employees", 0)
+    for dist in DISTRIBUTIONS:
+        stats[dist] = {decode_key(k): v for k, v in (doc.get(dist) or {}).items() if v > 0}
+    stats["revision"] = doc.get("revision", 0)
+    return stats
+
+async def apply_rollup_delta(db, delta: Dict):
+    """Apply a stats delta to the rollup with a single ``$inc``.
+
+    Never upserts: until the first reconciliation creates the document
+    there is nothing to keep in sync, and the reader builds it on demand.
+    """
+    increments = rollup_increments(delta)
+    if not increments:
+        return
+    increments["revision"] = 1
+    await db[ROLLUP_COLLECTION].update_one({"_id": ROLLUP_ID}, {"$inc": increments})
+
+async def apply_employee_change(db, before: Optional[Dict] = None, after: Optional[Dict] = None):
+    """Update the rollup for an employee create (after), delete (before) or update (both)"""
+    delta = empty_stats()
+    if before:
+        add_employee(delta, before, -1)
+    if after:
+        add_employee(delta, after, 1)
+    await apply_rollup_delta(db, delta)
+
+async def reconcile_rollups(db) -> Dict:
+    """Recompute the rollup from the employees collection, correcting drift"""
+    stats = await compute_org_stats(db["employees"])
+    fields = {"total_employees": stats["total_employees"], "reconciled_at": datetime.utcnow()}
+    for dist in DISTRIBUTIONS:
+        fields[dist] = {encode_key(k): v for k, v in stats[dist].items()}
+    doc = await db[ROLLUP_COLLECTION].find_one_and_update(
+        {"_id": ROLLUP_ID},
+        {"$set": fields, "$inc": {"revision": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return _decode_rollup(doc)
+
+async def load_rollup(db, skills: Optional[List[str]] = None) -> Dict:
+    """Read org-wide stats from the rollup in one small query.
+
+    ``skills`` (lowercased) limits which per-skill counts are fetched.
+    The rollup is built on first use if no reconciliation has run yet.
+    """
+    projection = None
+    if skills is not None:
+        projection = {"total_employees": 1, "revision": 1, "reconciled_at": 1}
+        projection.update({dist: 1 for dist in DISTRIBUTIONS if dist != "skills"})
+        projection.update({f"skills.{encode_key(s)}": 1 for s in skills})
+
+    doc = await db[ROLLUP_COLLECTION].find_one({"_id": ROLLUP_ID}, projection)
+    if not doc or "reconciled_at" not in doc:
+        stats = await reconcile_rollups(db)
+        if skills is not None:
+            stats["skills"] = {s: stats["skills"][s] for s in skills if s in stats["skills"]}
+        return stats
+    return _decode_rollup(doc)
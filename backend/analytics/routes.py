@@ -1,27 +1,36 @@
 from fastapi import APIRouter, HTTPException, Request
 from .models import (
     TeamAnalytics, SkillGapAnalysis, PerformanceMetrics, 
-    AnalyticsSummary, SkillCoverage, DiversityMetrics
+    AnalyticsSummary, SkillCoverage, DiversityMetrics,
+    ProjectSkillGaps, BatchSkillGapAnalysis
 )
+from .rollups import load_rollup
+from .semantic import DEFAULT_THRESHOLD, semantic_skill_counts
+from core.cache import TTLCache
+from core.pagination import DEFAULT_PAGE_SIZE, clamp_limit, decode_cursor, encode_cursor, keyset_filter
+from core.admission import detach_admission
+from core.revisions import revision_tag
+from optimization.telemetry import WINDOWS, load_window
 from bson import ObjectId
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Optional
+import numpy as np
+import asyncio
+import os
 import re
 
 router = APIRouter()
 
-def analyze_skill_coverage(employees: List[Dict], required_skills: List[str]) -> List[SkillCoverage]:
+# Computed analyses, keyed by their inputs (including the rollup revision)
+_analysis_cache = TTLCache(maxsize=512, ttl=float(os.getenv("ANALYTICS_CACHE_SECONDS", "300")))
+PERFORMANCE_CACHE_SECONDS = 30
+
+def analyze_skill_coverage(skill_index: Dict[str, int], total_employees: int, required_skills: List[str]) -> List[SkillCoverage]:
     """Analyze skill coverage across employees"""
     skill_coverage = []
-    total_employees = len(employees)
     
     for skill in required_skills:
-        employees_with_skill = 0
-        for emp in employees:
-            emp_skills = [s.get("name", "").lower() for s in emp.get("skills", [])]
-            if skill.lower() in emp_skills:
-                employees_with_skill += 1
-        
+        employees_with_skill = skill_index.get(skill.lower(), 0)
         coverage_percentage = (employees_with_skill / total_employees * 100) if total_employees > 0 else 0
         skill_coverage.append(SkillCoverage(
             skill=skill,
@@ -32,36 +41,26 @@ def analyze_skill_coverage(employees: List[Dict], required_skills: List[str]) ->
     
     return skill_coverage
 
-def analyze_diversity(employees: List[Dict]) -> DiversityMetrics:
-    """Analyze diversity metrics across employees"""
+def analyze_diversity(stats: Dict) -> DiversityMetrics:
+    """Build diversity metrics from org-wide employee statistics"""
     gender_dist = {"male": 0, "female": 0, "other": 0}
     seniority_dist = {"junior": 0, "mid": 0, "senior": 0}
-    department_dist = {}
     
-    for emp in employees:
-        # Gender distribution
-        gender = (emp.get("gender") or "other").lower()
+    for gender, count in stats["gender"].items():
         if gender in gender_dist:
-            gender_dist[gender] += 1
-        
-        # Seniority distribution
-        emp_skills = emp.get("skills", [])
-        for skill in emp_skills:
-            level = (skill.get("level") or "").lower()
-            if level in seniority_dist:
-                seniority_dist[level] += 1
-        
-        # Department distribution
-        dept = emp.get("department", "Unknown")
-        department_dist[dept] = department_dist.get(dept, 0) + 1
+            gender_dist[gender] += count
+    
+    for level, count in stats["seniority"].items():
+        if level in seniority_dist:
+            seniority_dist[level] += count
     
     return DiversityMetrics(
         gender_distribution=gender_dist,
         seniority_distribution=seniority_dist,
-        department_distribution=department_dist
+        department_distribution=dict(stats["department"])
     )
 
-def identify_skill_gaps(employees: List[Dict], required_skills: List[str]) -> SkillGapAnalysis:
+def identify_skill_gaps(skill_index: Dict[str, int], required_skills: List[str]) -> SkillGapAnalysis:
     """Identify skill gaps and provide recommendations"""
     missing_skills = []
     critical_gaps = []
@@ -70,11 +69,7 @@ def identify_skill_gaps(employees: List[Dict], required_skills: List[str]) -> Sk
     
     # Analyze each required skill
     for skill in required_skills:
-        employees_with_skill = 0
-        for emp in employees:
-            emp_skills = [s.get("name", "").lower() for s in emp.get("skills", [])]
-            if skill.lower() in emp_skills:
-                employees_with_skill += 1
+        employees_with_skill = skill_index.get(skill.lower(), 0)
         
         if employees_with_skill == 0:
             missing_skills.append(skill)
@@ -91,58 +86,109 @@ def identify_skill_gaps(employees: List[Dict], required_skills: List[str]) -> Sk
         hiring_recommendations=hiring_recommendations
     )
 
-async def calculate_performance_metrics(request: Request) -> PerformanceMetrics:
-    """Calculate performance metrics from audit logs"""
-    db = request.app.mongodb["audit_logs"]
+def batch_skill_gaps(projects: List[Dict], stats: Dict) -> List[ProjectSkillGaps]:
+    """Skill gap analysis for many projects at once.
+
+    Builds a projects x skills demand matrix and a per-skill supply vector
+    (the column sums of the employees x skills matrix, read from the rollup)
+    and derives coverage and gaps for every project with array operations.
+    """
+    project_skills = [
+        [r["role"].strip() for r in project.get("required_roles", []) if r.get("role")]
+        for project in projects
+    ]
+    vocabulary = sorted({s.lower() for skills in project_skills for s in skills})
+    column = {skill: i for i, skill in enumerate(vocabulary)}
+    
+    demand = np.zeros((len(projects), len(vocabulary)), dtype=bool)
+    for row, skills in enumerate(project_skills):
+        demand[row, [column[s.lower()] for s in skills]] = True
+    supply = np.array([stats["skills"].get(skill, 0) for skill in vocabulary], dtype=np.int64)
     
-    # Get optimization logs
-    optimization_logs = await db.find({"action": "optimize"}).to_list(1000)
-    total_optimizations = len(optimization_logs)
+    total_employees = stats["total_employees"]
+    coverage = demand * (supply / total_employees * 100 if total_employees > 0 else np.zeros_like(supply, dtype=float))
+    demanded = demand.sum(axis=1)
+    avg_coverage = np.divide(coverage.sum(axis=1), demanded, out=np.zeros(len(projects)), where=demanded > 0)
+    critical = demand & (supply == 0)
+    training = demand & (supply == 1)
     
-    # Calculate success rate (simplified - assume all optimizations are successful)
-    successful_optimizations = total_optimizations
+    results = []
+    for row, project in enumerate(projects):
+        # Report skills in the project's own casing and order
+        display = {}
+        for skill in project_skills[row]:
+            display.setdefault(skill.lower(), skill)
+        critical_gaps = [skill for key, skill in display.items() if critical[row, column[key]]]
+        training_gaps = [skill for key, skill in display.items() if training[row, column[key]]]
+        results.append(ProjectSkillGaps(
+            project_id=str(project["_id"]),
+            project_name=project.get("name", ""),
+            coverage_percentage=round(float(avg_coverage[row]), 2),
+            missing_skills=[skill for key, skill in display.items() if critical[row, column[key]] or training[row, column[key]]],
+            critical_gaps=critical_gaps,
+            training_recommendations=[f"Train existing employees in {s}" for s in training_gaps],
+            hiring_recommendations=[f"Hire {s} specialist" for s in critical_gaps]
+        ))
+    return results
+
+async def calculate_performance_metrics(request: Request, window: str = "all") -> PerformanceMetrics:
+    """Calculate performance metrics from pre-aggregated optimization telemetry"""
+    if window not in WINDOWS:
+        raise HTTPException(status_code=400, detail=f"window must be one of: {', '.join(WINDOWS)}")
+    cached = _analysis_cache.get(("performance", window))
+    if cached is not None:
+        return cached
     
-    # Calculate average team score (simplified)
-    average_team_score = 0.85  # Placeholder
+    # Sum at most 31 hourly/daily buckets, regardless of run volume
+    totals = await load_window(request.app.mongodb, window)
+    total_optimizations = totals["runs"]
+    successful_optimizations = totals["successful"]
     
-    # Calculate constraint satisfaction rate
-    constraint_satisfaction_rate = 0.92  # Placeholder
+    def per_success(value):
+        return value / successful_optimizations if successful_optimizations else 0.0
     
-    # Calculate diversity score
-    diversity_score = 0.78  # Placeholder
+    # Each stage averages over the runs that reached it
+    stage_latency_ms = {
+        stage: round(ms / totals["stage_counts"][stage], 2)
+        for stage, ms in totals["latency_ms_sum"].items()
+        if totals["stage_counts"].get(stage)
+    }
     
-    return PerformanceMetrics(
+    metrics = PerformanceMetrics(
         optimization_success_rate=round((successful_optimizations / total_optimizations * 100) if total_optimizations > 0 else 0, 2),
-        average_team_score=round(average_team_score, 2),
-        constraint_satisfaction_rate=round(constraint_satisfaction_rate, 2),
-        diversity_score=round(diversity_score, 2),
+        average_team_score=round(per_success(totals["score_sum"]), 2),
+        constraint_satisfaction_rate=round(per_success(totals["constraint_sum"]), 2),
+        diversity_score=round(per_success(totals["diversity_sum"]), 2),
         total_optimizations=total_optimizations,
-        successful_optimizations=successful_optimizations
+        successful_optimizations=successful_optimizations,
+        window=window,
+        average_latency_ms=stage_latency_ms.get("total", 0.0),
+        stage_latency_ms=stage_latency_ms
     )
+    _analysis_cache.set(("performance", window), metrics, ttl=PERFORMANCE_CACHE_SECONDS)
+    return metrics
 
-@router.get("/team/{project_id}", response_model=TeamAnalytics)
-async def get_team_analytics(project_id: str, request: Request):
-    """Get comprehensive analytics for a specific project/team"""
-    db_projects = request.app.mongodb["projects"]
-    db_employees = request.app.mongodb["employees"]
-    
-    # Fetch project
-    project = await db_projects.find_one({"_id": ObjectId(project_id)})
+async def fetch_required_skills(request: Request, project_id: str) -> List[str]:
+    """Fetch a project and return its required skills (roles are used as skills)"""
+    project = await request.app.mongodb["projects"].find_one(
+        {"_id": ObjectId(project_id)}, {"required_roles": 1}
+    )
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
-    
-    # Get required skills from project roles
-    required_roles = [r["role"].strip() for r in project.get("required_roles", []) if r.get("role")]
-    required_skills = required_roles  # Simplified - using roles as skills
-    
-    # Fetch all employees
-    employees = await db_employees.find().to_list(1000)
+    return [r["role"].strip() for r in project.get("required_roles", []) if r.get("role")]
+
+def build_team_analytics(project_id: str, required_skills: List[str], stats: Dict) -> TeamAnalytics:
+    """Build team analytics from one employee statistics snapshot"""
+    cache_key = ("team", project_id, tuple(required_skills), stats.get("revision"))
+    cached = _analysis_cache.get(cache_key)
+    if cached is not None:
+        return cached
     
     # Analyze skill coverage
-    skill_coverage = analyze_skill_coverage(employees, required_skills)
+    skill_coverage = analyze_skill_coverage(stats["skills"], stats["total_employees"], required_skills)
     
     # Analyze diversity
-    diversity_metrics = analyze_diversity(employees)
+    diversity_metrics = analyze_diversity(stats)
     
     # Calculate overall score
     avg_coverage = sum(sc.coverage_percentage for sc in skill_coverage) / len(skill_coverage) if skill_coverage else 0
@@ -160,7 +206,7 @@ async def get_team_analytics(project_id: str, request: Request):
     if not skill_gaps:
         recommendations.append("Team has good skill coverage for this project")
     
-    return TeamAnalytics(
+    team_analytics = TeamAnalytics(
         team_id=project_id,
         skill_coverage=skill_coverage,
         diversity_metrics=diversity_metrics,
@@ -168,43 +214,113 @@ async def get_team_analytics(project_id: str, request: Request):
         skill_gaps=skill_gaps,
         recommendations=recommendations
     )
+    _analysis_cache.set(cache_key, team_analytics)
+    return team_analytics
 
-@router.get("/skill-gaps/{project_id}", response_model=SkillGapAnalysis)
-async def get_skill_gap_analysis(project_id: str, request: Request):
-    """Get detailed skill gap analysis for a project"""
-    db_projects = request.app.mongodb["projects"]
-    db_employees = request.app.mongodb["employees"]
+def build_skill_gap_analysis(required_skills: List[str], stats: Dict) -> SkillGapAnalysis:
+    """Build a skill gap analysis from one employee statistics snapshot"""
+    cache_key = ("skill_gaps", tuple(required_skills), stats.get("revision"))
+    cached = _analysis_cache.get(cache_key)
+    if cached is None:
+        cached = identify_skill_gaps(stats["skills"], required_skills)
+        _analysis_cache.set(cache_key, cached)
+    return cached
+
+async def load_coverage_stats(request: Request, required_skills: List[str], mode: str = "exact",
+                              threshold: Optional[float] = None) -> Dict:
+    """Org-wide statistics with per-skill counts for the requested coverage mode.
+
+    ``exact`` matches skill names; ``semantic`` counts employees whose skill
+    embedding is at least ``threshold`` cosine-similar to each requirement.
+    """
+    if mode not in ("exact", "semantic"):
+        raise HTTPException(status_code=400, detail="mode must be 'exact' or 'semantic'")
     
-    # Fetch project
-    project = await db_projects.find_one({"_id": ObjectId(project_id)})
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
+    # Read org-wide employee statistics from the rollup
+    stats = await load_rollup(request.app.mongodb, [s.lower() for s in required_skills])
+    if mode == "exact":
+        return stats
+    
+    threshold = DEFAULT_THRESHOLD if threshold is None else threshold
+    if not 0 <= threshold <= 1:
+        raise HTTPException(status_code=400, detail="threshold must be between 0 and 1")
+    cache_key = ("semantic_counts", tuple(required_skills), threshold, stats.get("revision"))
+    counts = _analysis_cache.get(cache_key)
+    if counts is None:
+        try:
+            counts = await semantic_skill_counts(request.app.mongodb, required_skills, threshold)
+        except RuntimeError as e:
+            raise HTTPException(status_code=503, detail=f"Semantic coverage unavailable: {e}")
+        _analysis_cache.set(cache_key, counts)
     
-    # Get required skills
-    required_roles = [r["role"].strip() for r in project.get("required_roles", []) if r.get("role")]
-    required_skills = required_roles
+    # Tag the revision so analyses cached for each mode stay separate
+    return {**stats, "skills": counts, "revision": (stats.get("revision"), "semantic", threshold)}
+
+@router.get("/team/{project_id}", response_model=TeamAnalytics)
+async def get_team_analytics(project_id: str, request: Request, mode: str = "exact",
+                             threshold: Optional[float] = None):
+    """Get comprehensive analytics for a specific project/team"""
+    required_skills = await fetch_required_skills(request, project_id)
+    stats = await load_coverage_stats(request, required_skills, mode, threshold)
+    return build_team_analytics(project_id, required_skills, stats)
+
+@router.get("/skill-gaps", response_model=BatchSkillGapAnalysis)
+async def get_batch_skill_gap_analysis(request: Request, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE):
+    """Get skill gap analysis for every project, one page of projects at a time"""
+    limit = clamp_limit(limit)
+    query = keyset_filter([("_id", 1)], decode_cursor(cursor)) if cursor else {}
+    projects_cursor = request.app.mongodb["projects"].find(query, {"name": 1, "required_roles": 1})
     
-    # Fetch all employees
-    employees = await db_employees.find().to_list(1000)
+    projects, stats = await asyncio.gather(
+        projects_cursor.sort("_id", 1).limit(limit).to_list(limit),
+        load_rollup(request.app.mongodb)
+    )
     
-    # Analyze skill gaps
-    return identify_skill_gaps(employees, required_skills)
+    next_cursor = encode_cursor(projects[-1]["_id"]) if len(projects) == limit else None
+    return BatchSkillGapAnalysis(
+        projects=batch_skill_gaps(projects, stats),
+        total_employees=stats["total_employees"],
+        next_cursor=next_cursor
+    )
+
+@router.get("/skill-gaps/{project_id}", response_model=SkillGapAnalysis)
+async def get_skill_gap_analysis(project_id: str, request: Request, mode: str = "exact",
+                                 threshold: Optional[float] = None):
+    """Get detailed skill gap analysis for a project"""
+    required_skills = await fetch_required_skills(request, project_id)
+    stats = await load_coverage_stats(request, required_skills, mode, threshold)
+    return build_skill_gap_analysis(required_skills, stats)
 
 @router.get("/performance", response_model=PerformanceMetrics)
-async def get_performance_metrics(request: Request):
-    """Get overall performance metrics"""
-    return await calculate_performance_metrics(request)
+async def get_performance_metrics(request: Request, window: str = "all"):
+    """Get optimization performance metrics for a time window (1h, 24h, 7d, 30d or all)"""
+    return await calculate_performance_metrics(request, window)
 
 @router.get("/summary/{project_id}", response_model=AnalyticsSummary)
 async def get_analytics_summary(project_id: str, request: Request):
     """Get comprehensive analytics summary for a project"""
-    team_analytics = await get_team_analytics(project_id, request)
-    skill_gap_analysis = await get_skill_gap_analysis(project_id, request)
-    performance_metrics = await calculate_performance_metrics(request)
+    # Identical concurrent requests share one computation, which holds one admission
+    # slot until it finishes, even if the request that started it disconnects
+    revisions = await revision_tag(request.app.mongodb, "projects", "employees")
+    slot = detach_admission(request)
+    return await request.app.singleflight.do(
+        ("analytics_summary", project_id, revisions), _analytics_summary, project_id, request,
+        on_coalesce=slot.release, on_finish=slot.release
+    )
+
+async def _analytics_summary(project_id: str, request: Request) -> AnalyticsSummary:
+    # One project fetch and one employee statistics snapshot, fetched
+    # concurrently with the performance metrics and shared by all analyses;
+    # coverage and gaps both read the snapshot's skill index
+    required_skills, stats, performance_metrics = await asyncio.gather(
+        fetch_required_skills(request, project_id),
+        load_rollup(request.app.mongodb),
+        calculate_performance_metrics(request)
+    )
     
     return AnalyticsSummary(
-        team_analytics=team_analytics,
-        skill_gap_analysis=skill_gap_analysis,
+        team_analytics=build_team_analytics(project_id, required_skills, stats),
+        skill_gap_analysis=build_skill_gap_analysis(required_skills, stats),
         performance_metrics=performance_metrics,
         generated_at=datetime.utcnow()
-    ) 
\ No newline at end of file
+    )
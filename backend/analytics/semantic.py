@@ -0,0 +1,37 @@
+import asyncio
+import os
+from typing import Dict, List
+
+import numpy as np
+
+from optimization.embeddings import encode
+
+DEFAULT_THRESHOLD = float(os.getenv("SEMANTIC_COVERAGE_THRESHOLD", "0.5"))
+
+def semantic_coverage_counts(required_skills: List[str], employee_skills: List[List[str]], threshold: float) -> Dict[str, int]:
+    """Count employees with a skill within ``threshold`` cosine similarity of each requirement.
+
+    Each distinct skill name is embedded once; an employee covers a
+    requirement when the best match among their own skills reaches the
+    threshold.
+    """
+    names = sorted({name for skills in employee_skills for name in skills})
+    if not required_skills or not names:
+        return {skill.lower(): 0 for skill in required_skills}
+    column = {name: i for i, name in enumerate(names)}
+    # (distinct skills x employees) membership matrix
+    membership = np.zeros((len(names), len(employee_skills)), dtype=np.int32)
+    for j, skills in enumerate(employee_skills):
+        membership[[column[name] for name in skills], j] = 1
+    matched = (encode(required_skills) @ encode(names).T >= threshold).astype(np.int32)
+    counts = ((matched @ membership) > 0).sum(axis=1)
+    return {skill.lower(): int(count) for skill, count in zip(required_skills, counts)}
+
+async def semantic_skill_counts(db, required_skills: List[str], threshold: float) -> Dict[str, int]:
+    """Semantic per-skill employee counts, keyed like the rollup's skill counts"""
+    employee_skills = [
+        [s["name"] for s in emp.get("skills", []) if s.get("name")]
+        async for emp in db["employees"].find({}, {"skills.name": 1, "_id": 0})
+    ]
+    # Encoding is CPU-bound; keep it off the event loop
+    return await asyncio.to_thread(semantic_coverage_counts, required_skills, employee_skills, threshold)
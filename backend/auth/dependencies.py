@@ -0,0 +1,66 @@
+import os
+from typing import Dict, Optional
+
+from bson import ObjectId
+from fastapi import Depends, HTTPException, Request
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+from core.cache import TTLCache
+from .tokens import STREAM_SCOPE, decode_access_token
+
+USER_CACHE_SECONDS = float(os.getenv("USER_CACHE_SECONDS", "30"))
+
+# User records keyed by id; dropped on every write to the user
+_user_cache = TTLCache(maxsize=int(os.getenv("USER_CACHE_SIZE", "10000")), ttl=USER_CACHE_SECONDS)
+
+_bearer = HTTPBearer(auto_error=False)
+
+# EventSource cannot send headers, so event streams take a stream token here instead
+STREAM_TOKEN_PARAM = "access_token"
+
+def invalidate_user(user_id: str):
+    _user_cache.pop(user_id)
+
+async def load_user(db, user_id: str) -> Optional[Dict]:
+    user = _user_cache.get(user_id)
+    if user is not None:
+        return user
+    if not ObjectId.is_valid(user_id):
+        return None
+    user = await db["users"].find_one({"_id": ObjectId(user_id)}, {"hashed_password": 0})
+    if user is None:
+        return None
+    user["id"] = str(user.pop("_id"))
+    _user_cache.set(user_id, user)
+    return user
+
+async def get_current_user(
+    request: Request,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(_bearer)
+) -> Dict:
+    """Authenticated user for a bearer token.
+
+    Claims and user records are cached, so a warm request costs neither a
+    signature check nor a database round trip. Event-stream requests may
+    instead pass a short-lived stream token (from ``/auth/stream-token``)
+    as ``?access_token=``; stream tokens are accepted nowhere else.
+    """
+    stream_token = request.query_params.get(STREAM_TOKEN_PARAM)
+    if credentials is None and stream_token and "text/event-stream" in request.headers.get("accept", ""):
+        claims = decode_access_token(stream_token)
+        if claims.get("scope") != STREAM_SCOPE:
+            raise HTTPException(status_code=401, detail="Not a stream token", headers={"WWW-Authenticate": "Bearer"})
+    elif credentials is None:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    else:
+        claims = decode_access_token(credentials.credentials)
+        if claims.get("scope") == STREAM_SCOPE:
+            raise HTTPException(status_code=401, detail="Stream tokens only open event streams",
+                                headers={"WWW-Authenticate": "Bearer"})
+    user = await load_user(request.app.mongodb, claims["sub"])
+    if user is None:
+        raise HTTPException(status_code=401, detail="User not found", headers={"WWW-Authenticate": "Bearer"})
+    return user
+
+def stats():
+    return {"size": len(_user_cache), "hits": _user_cache.hits, "misses": _user_cache.misses}
@@ -0,0 +1,59 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+
+from .models import hash_password, verify_and_update_password
+
+# bcrypt is deliberately slow CPU work; it runs on a small dedicated pool
+HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Requests allowed to wait for a worker before new ones are rejected with 503
+HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", "32"))
+RETRY_AFTER_SECONDS = 1
+
+_executor: Optional[ThreadPoolExecutor] = None
+_counters = {"pending": 0, "completed": 0, "failed": 0, "rejected": 0}
+
+def _get_executor() -> ThreadPoolExecutor:
+    """The hashing pool, created on first use and again after shutdown()"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="bcrypt")
+    return _executor
+
+async def _run(fn, *args):
+    if _counters["pending"] >= HASH_WORKERS + HASH_QUEUE_LIMIT:
+        _counters["rejected"] += 1
+        raise HTTPException(
+            status_code=503,
+            detail="Too many concurrent password checks, retry shortly",
+            headers={"Retry-After": str(RETRY_AFTER_SECONDS)}
+        )
+    _counters["pending"] += 1
+    try:
+        result = await asyncio.get_running_loop().run_in_executor(_get_executor(), fn, *args)
+    except BaseException:
+        _counters["failed"] += 1
+        raise
+    finally:
+        _counters["pending"] -= 1
+    _counters["completed"] += 1
+    return result
+
+async def hash_password_async(password: str) -> str:
+    return await _run(hash_password, password)
+
+async def verify_password_async(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify off the event loop; the second item is a replacement hash, if one is due"""
+    return await _run(verify_and_update_password, password, hashed_password)
+
+def stats():
+    return {**_counters, "workers": HASH_WORKERS, "queue_limit": HASH_QUEUE_LIMIT}
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,42 @@
+import os
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+# Audit entries older than this are removed by a TTL index (0 keeps them forever)
+AUDIT_LOG_RETENTION_DAYS = int(os.getenv("AUDIT_LOG_RETENTION_DAYS", "0"))
+
+AUDIT_LOG_SORT = [("timestamp", DESCENDING), ("_id", DESCENDING)]
+
+# Filterable audit fields; each gets a (<field>, timestamp, _id) index for keyset paging
+AUDIT_LOG_FILTERS = ["action", "user_id", "employee_id", "project_id"]
+
+INDEXES = {
+    "users": [
+        IndexModel([("email", ASCENDING)], unique=True),
+    ],
+    "audit_logs": [
+        IndexModel(AUDIT_LOG_SORT),
+        *[IndexModel([(field, ASCENDING), *AUDIT_LOG_SORT]) for field in AUDIT_LOG_FILTERS],
+    ],
+}
+
+# Superseded indexes, dropped at startup: timestamp_-1 is covered by the AUDIT_LOG_SORT index
+DROPPED_INDEXES = {
+    "audit_logs": ["timestamp_-1"],
+}
+
+if AUDIT_LOG_RETENTION_DAYS > 0:
+    INDEXES["audit_logs"].append(
+        IndexModel([("timestamp", ASCENDING)], name="timestamp_ttl",
+                   expireAfterSeconds=AUDIT_LOG_RETENTION_DAYS * 86400)
+    )
+else:
+    # Retention turned off: stop expiring entries
+    DROPPED_INDEXES["audit_logs"].append("timestamp_ttl")
+
+# Representative route queries as (collection, filter, sort), checked by core.indexes
+QUERIES = [
+    ("users", {"email": "someone@example.com"}, None),
+    ("audit_logs", {}, AUDIT_LOG_SORT),
+    *[("audit_logs", {field: "x"}, AUDIT_LOG_SORT) for field in AUDIT_LOG_FILTERS],
+]
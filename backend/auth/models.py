@@ -1,9 +1,13 @@
 from pydantic import BaseModel, EmailStr
 from passlib.context import CryptContext
-from typing import Optional
+from typing import Optional, Tuple
 from datetime import datetime
+import os
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes with a different cost factor are upgraded on the next login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 
 class UserInDB(BaseModel):
     id: Optional[str] = None
@@ -31,4 +35,8 @@ def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password) 
\ No newline at end of file
+    return pwd_context.verify(plain_password, hashed_password) 
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password; also returns a new hash if the stored one is outdated"""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
@@ -1,22 +1,19 @@
-from fastapi import APIRouter, HTTPException, Request
-from .models import UserCreate, UserLogin, UserOut, hash_password, verify_password
-from datetime import datetime, timedelta
-from jose import JWTError, jwt
-from bson import ObjectId
-import os
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from .models import UserCreate, UserLogin, UserOut
+from .hashing import hash_password_async, verify_password_async
+from .tokens import STREAM_TOKEN_EXPIRE_SECONDS, create_access_token, create_stream_token
+from .dependencies import get_current_user, invalidate_user
+from .indexes import AUDIT_LOG_SORT
+from core.export import BATCH_SIZE, streaming_export
+from core.listing import list_page
+from core.pagination import DEFAULT_PAGE_SIZE
+from datetime import datetime
+from typing import Dict, Optional
+import json
 
 router = APIRouter()
-
-SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key")
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
-
-def create_access_token(data: dict):
-    to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+# Audit history; mounted under /auth with the app's protected dependencies
+audit_router = APIRouter()
 
 @router.post("/register", response_model=UserOut)
 async def register(user: UserCreate, request: Request):
@@ -31,19 +28,15 @@ async def register(user: UserCreate, request: Request):
     user_data = {
         "name": user.name,
         "email": user.email,
-        "hashed_password": hash_password(user.password),
+        "hashed_password": await hash_password_async(user.password),
         "created_at": datetime.utcnow()
     }
     
     result = await db.insert_one(user_data)
     user_data["id"] = str(result.inserted_id)
     
-    # Audit log
-    await request.app.mongodb["audit_logs"].insert_one({
-        "action": "user_register",
-        "user_id": str(result.inserted_id),
-        "timestamp": datetime.utcnow()
-    })
+    # Audit log (write-behind)
+    request.app.audit_logger.log("user_register", user_id=str(result.inserted_id))
     
     return UserOut(**user_data)
 
@@ -53,23 +46,96 @@ async def login(user: UserLogin, request: Request):
     
     # Find user
     user_data = await db.find_one({"email": user.email})
-    if not user_data or not verify_password(user.password, user_data["hashed_password"]):
+    if not user_data:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    valid, new_hash = await verify_password_async(user.password, user_data["hashed_password"])
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
+    # Transparently upgrade hashes made with an old cost factor
+    if new_hash:
+        await db.update_one({"_id": user_data["_id"]}, {"$set": {"hashed_password": new_hash}})
+        invalidate_user(str(user_data["_id"]))
+    
     # Create access token
     access_token = create_access_token(data={"sub": str(user_data["_id"])})
     
-    # Audit log
-    await request.app.mongodb["audit_logs"].insert_one({
-        "action": "user_login",
-        "user_id": str(user_data["_id"]),
-        "timestamp": datetime.utcnow()
-    })
+    # Audit log (write-behind)
+    request.app.audit_logger.log("user_login", user_id=str(user_data["_id"]))
     
     return {"access_token": access_token, "token_type": "bearer"}
 
-@router.get("/audit-logs")
-async def get_audit_logs(request: Request):
+@router.get("/me")
+async def me(user: dict = Depends(get_current_user)):
+    return user
+
+@router.post("/stream-token")
+async def stream_token(user: dict = Depends(get_current_user)):
+    """Short-lived token for opening an event stream with EventSource, which cannot send headers"""
+    return {"stream_token": create_stream_token(user["id"]), "expires_in": STREAM_TOKEN_EXPIRE_SECONDS}
+
+def _audit_query(action: Optional[str], user_id: Optional[str], employee_id: Optional[str],
+                 project_id: Optional[str], since: Optional[datetime], until: Optional[datetime]) -> Dict:
+    filters = {"action": action, "user_id": user_id, "employee_id": employee_id, "project_id": project_id}
+    query = {field: value for field, value in filters.items() if value is not None}
+    if since or until:
+        query["timestamp"] = {}
+        if since:
+            query["timestamp"]["$gte"] = since
+        if until:
+            query["timestamp"]["$lt"] = until
+    return query
+
+def _audit_entry(doc: Dict) -> Dict:
+    doc["id"] = str(doc.pop("_id"))
+    return doc
+
+@audit_router.get("/audit-logs")
+async def get_audit_logs(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    action: Optional[str] = None,
+    user_id: Optional[str] = None,
+    employee_id: Optional[str] = None,
+    project_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+):
+    """Audit entries, newest first, a page at a time (next page token in X-Next-Cursor)"""
     db = request.app.mongodb["audit_logs"]
-    logs = await db.find().sort("timestamp", -1).limit(100).to_list(100)
-    return logs 
\ No newline at end of file
+    query = _audit_query(action, user_id, employee_id, project_id, since, until)
+    logs = await list_page(db, query, None, cursor, limit, response, sort=AUDIT_LOG_SORT)
+    return [_audit_entry(doc) for doc in logs]
+
+AUDIT_LOG_COLUMNS = [
+    ("id", "string"), ("action", "string"), ("timestamp", "timestamp"), ("user_id", "string"),
+    ("employee_id", "string"), ("project_id", "string"), ("details", "string"),
+]
+
+@audit_router.get("/audit-logs/export")
+async def export_audit_logs(
+    request: Request,
+    format: str = "ndjson",
+    action: Optional[str] = None,
+    user_id: Optional[str] = None,
+    employee_id: Optional[str] = None,
+    project_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+):
+    """Stream matching audit entries, newest first"""
+    query = _audit_query(action, user_id, employee_id, project_id, since, until)
+    columns = {name for name, _ in AUDIT_LOG_COLUMNS}
+    
+    async def rows():
+        cursor = request.app.mongodb["audit_logs"].find(query).sort(AUDIT_LOG_SORT).batch_size(BATCH_SIZE)
+        async for doc in cursor:
+            entry = _audit_entry(doc)
+            details = {k: v for k, v in entry.items() if k not in columns}
+            row = {name: entry.get(name) for name, _ in AUDIT_LOG_COLUMNS}
+            row["details"] = json.dumps(details, default=str) if details else None
+            yield row
+    
+    return streaming_export(rows(), AUDIT_LOG_COLUMNS, format, "audit_logs")
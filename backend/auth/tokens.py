@@ -0,0 +1,54 @@
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict
+
+from fastapi import HTTPException
+from jose import JWTError, jwt
+
+from core.cache import TTLCache
+
+SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key")
+ALGORITHM = "HS256"
+ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# Lifetime of the query-string tokens EventSource clients open streams with
+STREAM_TOKEN_EXPIRE_SECONDS = int(os.getenv("STREAM_TOKEN_SECONDS", "60"))
+STREAM_SCOPE = "stream"
+
+# Decoded claims keyed by token; each entry expires with its token
+_claims_cache = TTLCache(maxsize=int(os.getenv("TOKEN_CACHE_SIZE", "10000")), ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
+def create_access_token(data: dict, expires_delta: timedelta = None):
+    to_encode = data.copy()
+    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
+    to_encode.update({"exp": expire})
+    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    return encoded_jwt
+
+def create_stream_token(user_id: str) -> str:
+    """Short-lived token that is only accepted as an event stream's ``access_token`` parameter"""
+    return create_access_token(
+        {"sub": user_id, "scope": STREAM_SCOPE}, timedelta(seconds=STREAM_TOKEN_EXPIRE_SECONDS)
+    )
+
+def decode_access_token(token: str) -> Dict:
+    """Verified claims of a bearer token; raises 401 if invalid or expired.
+
+    Only the first request with a token pays for signature verification.
+    """
+    claims = _claims_cache.get(token)
+    if claims is not None:
+        return claims
+    try:
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Invalid or expired token", headers={"WWW-Authenticate": "Bearer"})
+    if "sub" not in claims:
+        raise HTTPException(status_code=401, detail="Invalid token", headers={"WWW-Authenticate": "Bearer"})
+    remaining = claims.get("exp", time.time()) - time.time()
+    if remaining > 0:
+        _claims_cache.set(token, claims, ttl=remaining)
+    return claims
+
+def stats():
+    return {"size": len(_claims_cache), "hits": _claims_cache.hits, "misses": _claims_cache.misses}
@@ -0,0 +1,139 @@
+import asyncio
+import json
+import logging
+from typing import Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Messages buffered per subscriber; the oldest is dropped when a client falls behind
+SUBSCRIBER_BUFFER = 100
+# Backoff between attempts to resubscribe after the Redis connection drops
+RECONNECT_MIN_SECONDS = 0.5
+RECONNECT_MAX_SECONDS = 30.0
+
+class LocalBroker:
+    """In-process pub/sub keyed by channel (one channel per user).
+
+    Only reaches subscribers connected to this worker; use RedisBroker
+    when running several workers.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self.counters = {"published": 0, "delivered": 0, "dropped": 0}
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    def subscribe(self, channel: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_BUFFER)
+        self._subscribers.setdefault(channel, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, channel: str, queue: asyncio.Queue):
+        queues = self._subscribers.get(channel)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[channel]
+
+    def _deliver(self, channel: str, message: Dict):
+        for queue in self._subscribers.get(channel, ()):
+            if queue.full():
+                queue.get_nowait()
+                self.counters["dropped"] += 1
+            queue.put_nowait(message)
+            self.counters["delivered"] += 1
+
+    async def publish(self, channel: str, message: Dict):
+        self.counters["published"] += 1
+        self._deliver(channel, message)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            **self.counters,
+            "channels": len(self._subscribers),
+            "subscribers": sum(len(q) for q in self._subscribers.values()),
+        }
+
+class RedisBroker(LocalBroker):
+    """Fans messages out across workers through Redis pub/sub"""
+
+    PREFIX = "notifications:"
+
+    def __init__(self, url: str):
+        super().__init__()
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("NOTIFICATION_BROKER_URL requires the redis package")
+        self._redis = redis.from_url(url)
+        self._pubsub = None
+        self._task = None
+        self.counters["reconnects"] = 0
+
+    async def start(self):
+        await self._subscribe()
+        self._task = asyncio.create_task(self._listen())
+
+    async def _subscribe(self):
+        self._pubsub = self._redis.pubsub()
+        await self._pubsub.psubscribe(f"{self.PREFIX}*")
+
+    async def _close_pubsub(self):
+        if self._pubsub is not None:
+            try:
+                await self._pubsub.close()
+            except Exception:
+                pass
+            self._pubsub = None
+
+    async def _listen(self):
+        """Deliver messages until cancelled, resubscribing with backoff when Redis drops"""
+        delay = RECONNECT_MIN_SECONDS
+        while True:
+            try:
+                if self._pubsub is None:
+                    await self._subscribe()
+                    self.counters["reconnects"] += 1
+                    logger.info("Resubscribed to Redis notification channels")
+                async for item in self._pubsub.listen():
+                    delay = RECONNECT_MIN_SECONDS
+                    if item.get("type") != "pmessage":
+                        continue
+                    try:
+                        channel = item["channel"]
+                        if isinstance(channel, bytes):
+                            channel = channel.decode()
+                        self._deliver(channel[len(self.PREFIX):], json.loads(item["data"]))
+                    except Exception:
+                        logger.exception("Dropping malformed broker message")
+                logger.warning("Redis subscription ended; resubscribing in %.1fs", delay)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("Redis subscription failed; resubscribing in %.1fs", delay, exc_info=True)
+            await self._close_pubsub()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RECONNECT_MAX_SECONDS)
+
+    async def publish(self, channel: str, message: Dict):
+        self.counters["published"] += 1
+        await self._redis.publish(f"{self.PREFIX}{channel}", json.dumps(message, default=str))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        await self._close_pubsub()
+        await self._redis.close()
+
+def create_broker(url: Optional[str]) -> LocalBroker:
+    """Redis-backed broker if a URL is configured, otherwise in-process"""
+    return RedisBroker(url) if url else LocalBroker()
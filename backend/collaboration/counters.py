@@ -0,0 +1,55 @@
+import os
+from collections import Counter
+from typing import Dict, Iterable
+
+from pymongo import UpdateOne
+
+COUNTERS_COLLECTION = "notification_counters"
+RECONCILE_INTERVAL_SECONDS = float(os.getenv("NOTIFICATION_COUNTER_RECONCILE_SECONDS", "3600"))
+
+async def increment_unread(db, user_ids: Iterable[str]):
+    """Add one unread notification per occurrence of a user id (one bulk write).
+
+    Only existing counters are incremented: creating one here would count
+    just this batch, so a user's counter is seeded by get_unread instead.
+    """
+    counts = Counter(user_ids)
+    if not counts:
+        return
+    await db[COUNTERS_COLLECTION].bulk_write(
+        [UpdateOne({"_id": user_id}, {"$inc": {"unread": n}}) for user_id, n in counts.items()],
+        ordered=False
+    )
+
+async def decrement_unread(db, user_id: str):
+    await db[COUNTERS_COLLECTION].update_one({"_id": user_id}, {"$inc": {"unread": -1}})
+
+async def reset_unread(db, user_id: str):
+    await db[COUNTERS_COLLECTION].update_one({"_id": user_id}, {"$set": {"unread": 0}}, upsert=True)
+
+async def get_unread(db, user_id: str) -> int:
+    """O(1) unread count; the first lookup for a user seeds the counter"""
+    doc = await db[COUNTERS_COLLECTION].find_one({"_id": user_id})
+    if doc is None:
+        count = await db["notifications"].count_documents({"user_id": user_id, "read": False})
+        await db[COUNTERS_COLLECTION].update_one(
+            {"_id": user_id}, {"$setOnInsert": {"unread": count}}, upsert=True
+        )
+        return count
+    return max(doc.get("unread", 0), 0)
+
+async def reconcile_counters(db) -> Dict[str, int]:
+    """Recount unread notifications per user and overwrite the counters"""
+    pipeline = [
+        {"$match": {"read": False}},
+        {"$group": {"_id": "$user_id", "unread": {"$sum": 1}}},
+    ]
+    counts = {doc["_id"]: doc["unread"] async for doc in db["notifications"].aggregate(pipeline)}
+    counters = db[COUNTERS_COLLECTION]
+    if counts:
+        await counters.bulk_write(
+            [UpdateOne({"_id": user_id}, {"$set": {"unread": n}}, upsert=True) for user_id, n in counts.items()],
+            ordered=False
+        )
+    await counters.update_many({"_id": {"$nin": list(counts)}, "unread": {"$ne": 0}}, {"$set": {"unread": 0}})
+    return counts
@@ -0,0 +1,42 @@
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+# Keyset order of every collaboration list: newest first
+NEWEST_FIRST = [("created_at", DESCENDING), ("_id", DESCENDING)]
+
+def participant_indexes(*fields):
+    """(project_id, <user field>) indexes covering the notifier's participant ``distinct`` scans"""
+    return [IndexModel([("project_id", ASCENDING), (field, ASCENDING)]) for field in fields]
+
+# Per-project and per-user lookups, newest first
+INDEXES = {
+    "feedback": [
+        IndexModel([("project_id", ASCENDING), *NEWEST_FIRST]),
+        *participant_indexes("user_id"),
+    ],
+    "approvals": [
+        IndexModel([("project_id", ASCENDING), *NEWEST_FIRST]),
+        *participant_indexes("requester_id", "approver_id"),
+    ],
+    "comments": [
+        IndexModel([("project_id", ASCENDING), *NEWEST_FIRST]),
+        # Thread roots page, and one $in fetch of their replies
+        IndexModel([("project_id", ASCENDING), ("parent_comment_id", ASCENDING), *NEWEST_FIRST]),
+        IndexModel([("root_comment_id", ASCENDING), ("created_at", ASCENDING)]),
+        *participant_indexes("user_id"),
+    ],
+    "notifications": [
+        IndexModel([("user_id", ASCENDING), *NEWEST_FIRST]),
+        IndexModel([("user_id", ASCENDING), ("read", ASCENDING)]),
+    ],
+}
+
+# Representative route queries as (collection, filter, sort), checked by core.indexes
+QUERIES = [
+    ("feedback", {"project_id": "p"}, NEWEST_FIRST),
+    ("approvals", {"project_id": "p"}, NEWEST_FIRST),
+    ("comments", {"project_id": "p"}, NEWEST_FIRST),
+    ("comments", {"project_id": "p", "parent_comment_id": None}, NEWEST_FIRST),
+    ("comments", {"root_comment_id": {"$in": ["c"]}}, None),
+    ("notifications", {"user_id": "u"}, NEWEST_FIRST),
+    ("notifications", {"user_id": "u", "read": False}, None),
+]
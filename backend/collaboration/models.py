@@ -58,9 +58,14 @@ class Comment(BaseModel):
     user_name: str
     content: str
     parent_comment_id: Optional[str] = None
+    root_comment_id: Optional[str] = None  # Set by the server: top-level comment of the thread
     created_at: datetime
     updated_at: Optional[datetime] = None
 
+class CommentThread(Comment):
+    """A comment with its replies, oldest first"""
+    replies: List["CommentThread"] = []
+
 class Notification(BaseModel):
     id: Optional[str] = None
     user_id: str
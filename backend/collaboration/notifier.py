@@ -0,0 +1,130 @@
+import asyncio
+import logging
+import os
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from bson import ObjectId
+
+from core.batch_writer import BatchWriter
+from .broker import LocalBroker
+from .counters import increment_unread
+from .models import Notification, NotificationType
+
+logger = logging.getLogger(__name__)
+
+# Marks a queued project fan-out job, expanded into notifications when flushed
+FANOUT_KEY = "_fanout"
+
+async def project_participants(db, project_id: str, exclude: Optional[str] = None) -> List[str]:
+    """Users who have given feedback, commented, or requested or approved on a project.
+
+    Projects carry no membership list, so these are the project's members
+    for notifications; ``exclude`` (the acting user) is left out. Each
+    ``distinct`` is covered by a (project_id, <user field>) index.
+    """
+    results = await asyncio.gather(
+        db["feedback"].distinct("user_id", {"project_id": project_id}),
+        db["comments"].distinct("user_id", {"project_id": project_id}),
+        db["approvals"].distinct("requester_id", {"project_id": project_id}),
+        db["approvals"].distinct("approver_id", {"project_id": project_id}),
+    )
+    return sorted({user_id for ids in results for user_id in ids if user_id and user_id != exclude})
+
+def notification_event(doc: Dict) -> Dict:
+    """JSON-ready push event for a stored notification"""
+    fields = {k: v for k, v in doc.items() if k != "_id"}
+    notification = Notification(id=str(doc["_id"]), **fields).model_dump(mode="json")
+    return {"type": "notification", "notification": notification, "unread_delta": 1}
+
+class Notifier(BatchWriter):
+    """Write-behind notification queue with fan-out to many recipients.
+
+    Handlers enqueue without awaiting; a background task inserts queued
+    notifications in ``insert_many`` batches and drains on shutdown. Once
+    a batch is stored, the recipients' unread counters are incremented and
+    each notification is pushed to its recipient's broker channel.
+
+    ``notify_project`` queues a single fan-out job instead; its recipients
+    are resolved by the background task, off the request path.
+    """
+
+    def __init__(self, broker: Optional[LocalBroker] = None):
+        super().__init__(
+            "notifications",
+            max_batch=int(os.getenv("NOTIFICATION_BATCH_SIZE", "500")),
+            flush_interval=float(os.getenv("NOTIFICATION_FLUSH_SECONDS", "0.25")),
+            max_queue=int(os.getenv("NOTIFICATION_QUEUE_SIZE", "50000")),
+            on_flush=self._after_write,
+        )
+        self.broker = broker
+
+    async def _expand(self, job: Dict) -> List[Dict]:
+        try:
+            recipients = await project_participants(self._db, job["project_id"], exclude=job["exclude"])
+        except Exception:
+            self.counters["failed"] += 1
+            logger.exception("Failed to resolve recipients for project %s", job["project_id"])
+            return []
+        return [self._notification(user_id, **job["fields"]) for user_id in recipients]
+
+    async def _write(self, batch: List[Dict]):
+        docs = []
+        for doc in batch:
+            docs.extend(await self._expand(doc) if doc.get(FANOUT_KEY) else [doc])
+        # A fan-out can grow the batch past max_batch; insert it in max_batch chunks
+        for start in range(0, len(docs), self.max_batch):
+            await super()._write(docs[start:start + self.max_batch])
+
+    async def _after_write(self, db, batch: List[Dict]):
+        await increment_unread(db, (doc["user_id"] for doc in batch))
+        if self.broker is None:
+            return
+        for doc in batch:
+            await self.broker.publish(doc["user_id"], notification_event(doc))
+
+    def notify(self, user_ids: Iterable[str], notification_type: NotificationType, title: str, message: str,
+               project_id: Optional[str] = None, team_id: Optional[str] = None) -> List[str]:
+        """Queue one notification per distinct recipient; returns the queued ids"""
+        now = datetime.utcnow()
+        queued = []
+        for user_id in dict.fromkeys(user_ids):
+            notification = self._notification(user_id, notification_type, title, message, project_id, team_id, now)
+            if self.submit(notification):
+                queued.append(str(notification["_id"]))
+        return queued
+
+    def notify_project(self, project_id: str, notification_type: NotificationType, title: str, message: str,
+                       exclude: Optional[str] = None, team_id: Optional[str] = None) -> bool:
+        """Queue a notification for every participant of a project except ``exclude``.
+
+        Returns False if the fan-out job had to be dropped.
+        """
+        return self.submit({
+            FANOUT_KEY: True,
+            "project_id": project_id,
+            "exclude": exclude,
+            "fields": {
+                "notification_type": notification_type,
+                "title": title,
+                "message": message,
+                "project_id": project_id,
+                "team_id": team_id,
+                "created_at": datetime.utcnow(),
+            },
+        })
+
+    @staticmethod
+    def _notification(user_id: str, notification_type: NotificationType, title: str, message: str,
+                      project_id: Optional[str], team_id: Optional[str], created_at: datetime) -> Dict:
+        return {
+            "_id": ObjectId(),
+            "user_id": user_id,
+            "notification_type": notification_type,
+            "title": title,
+            "message": message,
+            "project_id": project_id,
+            "team_id": team_id,
+            "read": False,
+            "created_at": created_at,
+        }
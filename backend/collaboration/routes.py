@@ -1,15 +1,43 @@
-from fastapi import APIRouter, HTTPException, Request, Depends
+from fastapi import APIRouter, HTTPException, Request, Response, Depends
+from fastapi.responses import StreamingResponse
 from .models import (
-    Feedback, ApprovalRequest, Comment, Notification, CollaborationSummary,
+    Feedback, ApprovalRequest, Comment, CommentThread, Notification, CollaborationSummary,
     FeedbackType, ApprovalStatus, NotificationType
 )
+from .indexes import NEWEST_FIRST
+from core.listing import list_page
 from datetime import datetime
 from bson import ObjectId
-from typing import List, Optional
+from pymongo import ReturnDocument
+from .counters import decrement_unread, get_unread, reset_unread
+from .stats import load_stats, record_approval, record_feedback
+from .threads import thread_root
+from typing import Dict, List, Optional
+import asyncio
 import json
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Idle interval after which a keep-alive comment is sent on notification streams
+STREAM_HEARTBEAT_SECONDS = 15
+# Most replies returned with one page of comment threads
+MAX_THREAD_REPLIES = 1000
+REPLIES_TRUNCATED_HEADER = "X-Replies-Truncated"
+
+async def _update_stats(update):
+    """Apply a per-project stats update after the write it reflects.
+
+    The write has already succeeded, so a failure is logged rather than
+    returned; reconcile_stats corrects the drift.
+    """
+    try:
+        await update
+    except Exception:
+        logger.exception("Failed to update collaboration stats")
+
 # Feedback endpoints
 @router.post("/feedback", response_model=Feedback)
 async def create_feedback(feedback: Feedback, request: Request):
@@ -22,25 +50,27 @@ async def create_feedback(feedback: Feedback, request: Request):
     
     result = await db.insert_one(feedback_dict)
     feedback_dict["id"] = str(result.inserted_id)
+    await _update_stats(record_feedback(request.app.mongodb, feedback.project_id, feedback.rating))
     
-    # Create notification for project owner
-    await create_notification(
+    # Notify the project's other participants
+    notify_project_participants(
         request,
-        user_id=feedback.user_id,
+        feedback.project_id,
+        exclude=feedback.user_id,
         notification_type=NotificationType.FEEDBACK_RECEIVED,
         title="New Feedback Received",
         message=f"Feedback received for project: {feedback.feedback_type.value}",
-        project_id=feedback.project_id
     )
     
     return Feedback(**feedback_dict)
 
 @router.get("/feedback/{project_id}", response_model=List[Feedback])
-async def get_project_feedback(project_id: str, request: Request):
-    """Get all feedback for a project"""
+async def get_project_feedback(project_id: str, request: Request, response: Response,
+                               cursor: Optional[str] = None, limit: int = 1000):
+    """Get feedback for a project, newest first (next page token in X-Next-Cursor)"""
     db = request.app.mongodb["feedback"]
     
-    feedback_list = await db.find({"project_id": project_id}).to_list(1000)
+    feedback_list = await list_page(db, {"project_id": project_id}, None, cursor, limit, response, sort=NEWEST_FIRST)
     
     # Convert ObjectId to string
     for feedback in feedback_list:
@@ -62,11 +92,12 @@ async def create_approval_request(approval: ApprovalRequest, request: Request):
     
     result = await db.insert_one(approval_dict)
     approval_dict["id"] = str(result.inserted_id)
+    await _update_stats(record_approval(request.app.mongodb, approval.project_id, ApprovalStatus.PENDING.value))
     
     # Create notification for approver
-    await create_notification(
+    create_notification(
         request,
-        user_id=approval.approver_id,
+        user_ids=[approval.approver_id],
         notification_type=NotificationType.APPROVAL_REQUEST,
         title="Approval Request",
         message=f"Approval requested by {approval.requester_name}",
@@ -96,23 +127,26 @@ async def update_approval_status(
     if notes:
         update_data["approval_notes"] = notes
     
-    result = await db.update_one(
+    previous = await db.find_one_and_update(
         {"_id": ObjectId(approval_id)},
-        {"$set": update_data}
+        {"$set": update_data},
+        return_document=ReturnDocument.BEFORE
     )
     
-    if result.modified_count == 0:
+    if previous is None:
         raise HTTPException(status_code=404, detail="Approval request not found")
+    await _update_stats(
+        record_approval(request.app.mongodb, previous["project_id"], status.value, previous.get("status"))
+    )
     
-    # Get updated approval
-    approval = await db.find_one({"_id": ObjectId(approval_id)})
-    approval["id"] = str(approval["_id"])
-    del approval["_id"]
+    # Updated approval, without re-reading it
+    approval = {**previous, **update_data}
+    approval["id"] = str(approval.pop("_id"))
     
     # Create notification for requester
-    await create_notification(
+    create_notification(
         request,
-        user_id=approval["requester_id"],
+        user_ids=[approval["requester_id"]],
         notification_type=NotificationType.STATUS_CHANGE,
         title="Approval Status Updated",
         message=f"Your approval request has been {status.value}",
@@ -122,11 +156,12 @@ async def update_approval_status(
     return ApprovalRequest(**approval)
 
 @router.get("/approvals/{project_id}", response_model=List[ApprovalRequest])
-async def get_project_approvals(project_id: str, request: Request):
-    """Get all approval requests for a project"""
+async def get_project_approvals(project_id: str, request: Request, response: Response,
+                                cursor: Optional[str] = None, limit: int = 1000):
+    """Get approval requests for a project, newest first (next page token in X-Next-Cursor)"""
     db = request.app.mongodb["approvals"]
     
-    approvals = await db.find({"project_id": project_id}).to_list(1000)
+    approvals = await list_page(db, {"project_id": project_id}, None, cursor, limit, response, sort=NEWEST_FIRST)
     
     # Convert ObjectId to string
     for approval in approvals:
@@ -145,27 +180,41 @@ async def create_comment(comment: Comment, request: Request):
     comment_dict["created_at"] = datetime.utcnow()
     comment_dict["_id"] = ObjectId()
     
+    # Every comment records the top-level comment of its thread
+    comment_dict["root_comment_id"] = str(comment_dict["_id"])
+    if comment.parent_comment_id:
+        if not ObjectId.is_valid(comment.parent_comment_id):
+            raise HTTPException(status_code=400, detail="Invalid parent comment id")
+        parent = await db.find_one(
+            {"_id": ObjectId(comment.parent_comment_id)},
+            {"project_id": 1, "parent_comment_id": 1, "root_comment_id": 1}
+        )
+        if parent is None or parent.get("project_id") != comment.project_id:
+            raise HTTPException(status_code=404, detail="Parent comment not found")
+        comment_dict["root_comment_id"] = await thread_root(request.app.mongodb, parent)
+    
     result = await db.insert_one(comment_dict)
     comment_dict["id"] = str(result.inserted_id)
     
-    # Create notification for project members
-    await create_notification(
+    # Notify the project's other participants
+    notify_project_participants(
         request,
-        user_id=comment.user_id,
+        comment.project_id,
+        exclude=comment.user_id,
         notification_type=NotificationType.COMMENT_ADDED,
         title="New Comment",
         message=f"New comment added by {comment.user_name}",
-        project_id=comment.project_id
     )
     
     return Comment(**comment_dict)
 
 @router.get("/comments/{project_id}", response_model=List[Comment])
-async def get_project_comments(project_id: str, request: Request):
-    """Get all comments for a project"""
+async def get_project_comments(project_id: str, request: Request, response: Response,
+                               cursor: Optional[str] = None, limit: int = 100):
+    """Get comments for a project, newest first (next page token in X-Next-Cursor)"""
     db = request.app.mongodb["comments"]
     
-    comments = await db.find({"project_id": project_id}).sort("created_at", -1).to_list(100)
+    comments = await list_page(db, {"project_id": project_id}, None, cursor, limit, response, sort=NEWEST_FIRST)
     
     # Convert ObjectId to string
     for comment in comments:
@@ -174,13 +223,51 @@ async def get_project_comments(project_id: str, request: Request):
     
     return [Comment(**comment) for comment in comments]
 
+@router.get("/comments/{project_id}/threads", response_model=List[CommentThread])
+async def get_comment_threads(project_id: str, request: Request, response: Response,
+                              cursor: Optional[str] = None, limit: int = 20,
+                              replies_limit: int = MAX_THREAD_REPLIES):
+    """Get a page of top-level comments, newest first, each with its reply tree.
+    
+    All replies on the page are fetched with a single ``$in`` on
+    ``root_comment_id``, so a page costs two queries however deep the
+    threads go. At most ``replies_limit`` replies (oldest first) are
+    returned per page; ``X-Replies-Truncated`` is set when more exist.
+    """
+    db = request.app.mongodb["comments"]
+    replies_limit = max(0, min(replies_limit, MAX_THREAD_REPLIES))
+    
+    roots = await list_page(
+        db, {"project_id": project_id, "parent_comment_id": None}, None, cursor, limit, response, sort=NEWEST_FIRST
+    )
+    root_ids = [str(root["_id"]) for root in roots]
+    replies = await db.find(
+        {"root_comment_id": {"$in": root_ids}, "parent_comment_id": {"$ne": None}}
+    ).sort("created_at", 1).limit(replies_limit + 1).to_list(None)
+    if len(replies) > replies_limit:
+        replies = replies[:replies_limit]
+        response.headers[REPLIES_TRUNCATED_HEADER] = "true"
+    
+    # Assemble the trees in memory
+    threads = {}
+    for doc in roots + replies:
+        doc["id"] = str(doc.pop("_id"))
+        threads[doc["id"]] = CommentThread(**doc)
+    for doc in replies:
+        parent = threads.get(doc["parent_comment_id"])
+        if parent is not None:
+            parent.replies.append(threads[doc["id"]])
+    
+    return [threads[root_id] for root_id in root_ids]
+
 # Notification endpoints
 @router.get("/notifications/{user_id}", response_model=List[Notification])
-async def get_user_notifications(user_id: str, request: Request):
-    """Get notifications for a user"""
+async def get_user_notifications(user_id: str, request: Request, response: Response,
+                                 cursor: Optional[str] = None, limit: int = 50):
+    """Get notifications for a user, newest first (next page token in X-Next-Cursor)"""
     db = request.app.mongodb["notifications"]
     
-    notifications = await db.find({"user_id": user_id}).sort("created_at", -1).to_list(50)
+    notifications = await list_page(db, {"user_id": user_id}, None, cursor, limit, response, sort=NEWEST_FIRST)
     
     # Convert ObjectId to string
     for notification in notifications:
@@ -194,62 +281,115 @@ async def mark_notification_read(notification_id: str, request: Request):
     """Mark a notification as read"""
     db = request.app.mongodb["notifications"]
     
-    result = await db.update_one(
-        {"_id": ObjectId(notification_id)},
-        {"$set": {"read": True}}
+    notification = await db.find_one_and_update(
+        {"_id": ObjectId(notification_id), "read": False},
+        {"$set": {"read": True}},
+        projection={"user_id": 1},
+        return_document=ReturnDocument.AFTER
     )
     
-    if result.modified_count == 0:
+    if notification is None:
         raise HTTPException(status_code=404, detail="Notification not found")
     
+    await decrement_unread(request.app.mongodb, notification["user_id"])
+    await request.app.broker.publish(notification["user_id"], {"type": "unread_delta", "unread_delta": -1})
+    
     return {"message": "Notification marked as read"}
 
+@router.put("/notifications/{user_id}/read-all")
+async def mark_all_notifications_read(user_id: str, request: Request):
+    """Mark every notification of a user as read"""
+    result = await request.app.mongodb["notifications"].update_many(
+        {"user_id": user_id, "read": False},
+        {"$set": {"read": True}}
+    )
+    await reset_unread(request.app.mongodb, user_id)
+    await request.app.broker.publish(user_id, {"type": "unread_count", "unread_count": 0})
+    
+    return {"message": "Notifications marked as read", "updated": result.modified_count}
+
 @router.get("/notifications/{user_id}/unread-count")
 async def get_unread_count(user_id: str, request: Request):
     """Get count of unread notifications for a user"""
-    db = request.app.mongodb["notifications"]
-    
-    count = await db.count_documents({"user_id": user_id, "read": False})
+    count = await get_unread(request.app.mongodb, user_id)
     
     return {"unread_count": count}
 
+def _sse(event: Dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+@router.get("/notifications/{user_id}/stream")
+async def stream_notifications(user_id: str, request: Request):
+    """Server-sent events with a user's new notifications and unread-count changes.
+    
+    The first event carries the current unread count; after that, changes
+    are pushed as they happen, so clients no longer need to poll.
+    """
+    broker = request.app.broker
+    queue = broker.subscribe(user_id)
+    unread = await get_unread(request.app.mongodb, user_id)
+    
+    async def events():
+        try:
+            yield _sse({"type": "unread_count", "unread_count": unread})
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keep-alive\n\n"
+                    continue
+                yield _sse(event)
+        finally:
+            broker.unsubscribe(user_id, queue)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # Collaboration summary
+async def _recent(collection, project_id: str, limit: int = 10) -> List[Dict]:
+    docs = await collection.find({"project_id": project_id}).sort("created_at", -1).to_list(limit)
+    for doc in docs:
+        doc["id"] = str(doc.pop("_id"))
+    return docs
+
+async def _no_unread() -> int:
+    return 0
+
 @router.get("/summary/{project_id}", response_model=CollaborationSummary)
-async def get_collaboration_summary(project_id: str, request: Request):
-    """Get collaboration summary for a project"""
-    feedback_db = request.app.mongodb["feedback"]
-    approvals_db = request.app.mongodb["approvals"]
-    comments_db = request.app.mongodb["comments"]
-    notifications_db = request.app.mongodb["notifications"]
-    
-    # Get feedback stats
-    feedback_count = await feedback_db.count_documents({"project_id": project_id})
-    
-    # Calculate average rating
-    pipeline = [
-        {"$match": {"project_id": project_id}},
-        {"$group": {"_id": None, "avg_rating": {"$avg": "$rating"}}}
-    ]
-    rating_result = await feedback_db.aggregate(pipeline).to_list(1)
-    average_rating = rating_result[0]["avg_rating"] if rating_result else 0.0
-    
-    # Get recent approvals
-    approvals = await approvals_db.find({"project_id": project_id}).sort("created_at", -1).to_list(10)
-    for approval in approvals:
-        approval["id"] = str(approval["_id"])
-        del approval["_id"]
+async def get_collaboration_summary(project_id: str, request: Request, user_id: Optional[str] = None):
+    """Get collaboration summary for a project (with ``user_id``'s unread count, if given).
+    
+    Ratings and approval counts come from running aggregates, and all reads
+    run concurrently, so latency is one round trip however much feedback a
+    project has. Identical concurrent requests share one computation.
+    """
+    return await request.app.singleflight.do(
+        ("collaboration_summary", project_id, user_id), _collaboration_summary, project_id, request, user_id
+    )
+
+async def _collaboration_summary(project_id: str, request: Request, user_id: Optional[str]) -> CollaborationSummary:
+    db = request.app.mongodb
+    stats, approvals, comments, unread = await asyncio.gather(
+        load_stats(db, project_id),
+        _recent(db["approvals"], project_id),
+        _recent(db["comments"], project_id),
+        get_unread(db, user_id) if user_id else _no_unread()
+    )
     
-    # Get recent comments
-    comments = await comments_db.find({"project_id": project_id}).sort("created_at", -1).to_list(10)
-    for comment in comments:
-        comment["id"] = str(comment["_id"])
-        del comment["_id"]
+    feedback_count = stats.get("feedback_count", 0)
+    average_rating = stats.get("rating_sum", 0) / feedback_count if feedback_count else 0.0
     
     # Calculate overall satisfaction (weighted average of feedback and approvals)
+    status_counts = stats.get("approvals") or {}
+    total_approvals = sum(status_counts.values())
     approval_satisfaction = 0.0
-    if approvals:
-        approved_count = sum(1 for a in approvals if a["status"] == ApprovalStatus.APPROVED)
-        approval_satisfaction = approved_count / len(approvals)
+    if total_approvals:
+        approval_satisfaction = status_counts.get(ApprovalStatus.APPROVED.value, 0) / total_approvals
     
     overall_satisfaction = (average_rating / 5.0 * 0.7) + (approval_satisfaction * 0.3)
     
@@ -259,27 +399,18 @@ async def get_collaboration_summary(project_id: str, request: Request):
         average_rating=average_rating,
         approval_requests=[ApprovalRequest(**a) for a in approvals],
         recent_comments=[Comment(**c) for c in comments],
-        unread_notifications=0,  # Would need user_id to calculate this
+        unread_notifications=unread,
         overall_satisfaction=overall_satisfaction
     )
 
 # Helper function to create notifications
-async def create_notification(request: Request, user_id: str, notification_type: NotificationType, 
-                            title: str, message: str, project_id: Optional[str] = None, 
-                            team_id: Optional[str] = None):
-    """Helper function to create notifications"""
-    db = request.app.mongodb["notifications"]
-    
-    notification = {
-        "user_id": user_id,
-        "notification_type": notification_type,
-        "title": title,
-        "message": message,
-        "project_id": project_id,
-        "team_id": team_id,
-        "read": False,
-        "created_at": datetime.utcnow(),
-        "_id": ObjectId()
-    }
-    
-    await db.insert_one(notification) 
\ No newline at end of file
+def create_notification(request: Request, user_ids: List[str], notification_type: NotificationType,
+                        title: str, message: str, project_id: Optional[str] = None,
+                        team_id: Optional[str] = None) -> List[str]:
+    """Queue a notification for each recipient (written in batches by the notifier)"""
+    return request.app.notifier.notify(user_ids, notification_type, title, message, project_id, team_id)
+
+def notify_project_participants(request: Request, project_id: str, exclude: str,
+                                notification_type: NotificationType, title: str, message: str) -> bool:
+    """Queue a notification for the project's other participants (resolved by the notifier)"""
+    return request.app.notifier.notify_project(project_id, notification_type, title, message, exclude=exclude)
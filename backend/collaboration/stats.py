@@ -0,0 +1,66 @@
+import os
+from typing import Dict, Optional
+
+from pymongo import UpdateOne
+
+from .models import ApprovalStatus
+
+STATS_COLLECTION = "collaboration_stats"
+RECONCILE_INTERVAL_SECONDS = float(os.getenv("COLLABORATION_STATS_RECONCILE_SECONDS", "3600"))
+
+def _empty() -> Dict:
+    return {"feedback_count": 0, "rating_sum": 0, "approvals": {s.value: 0 for s in ApprovalStatus}}
+
+async def record_feedback(db, project_id: str, rating: int):
+    # No upsert: a missing document is built from scratch on first read
+    await db[STATS_COLLECTION].update_one(
+        {"_id": project_id}, {"$inc": {"feedback_count": 1, "rating_sum": rating}}
+    )
+
+async def record_approval(db, project_id: str, status: str, previous: Optional[str] = None):
+    """Count an approval entering ``status`` (and leaving ``previous``, if given)"""
+    status, previous = ApprovalStatus(status).value, previous and ApprovalStatus(previous).value
+    if status == previous:
+        return
+    increments = {f"approvals.{status}": 1}
+    if previous:
+        increments[f"approvals.{previous}"] = -1
+    await db[STATS_COLLECTION].update_one({"_id": project_id}, {"$inc": increments})
+
+async def _compute(db, match: Dict) -> Dict[str, Dict]:
+    stats = {}
+    feedback = db["feedback"].aggregate([
+        {"$match": match},
+        {"$group": {"_id": "$project_id", "count": {"$sum": 1}, "rating_sum": {"$sum": "$rating"}}},
+    ])
+    async for doc in feedback:
+        entry = stats.setdefault(doc["_id"], _empty())
+        entry["feedback_count"] = doc["count"]
+        entry["rating_sum"] = doc["rating_sum"] or 0
+    approvals = db["approvals"].aggregate([
+        {"$match": match},
+        {"$group": {"_id": {"project_id": "$project_id", "status": "$status"}, "count": {"$sum": 1}}},
+    ])
+    async for doc in approvals:
+        entry = stats.setdefault(doc["_id"]["project_id"], _empty())
+        entry["approvals"][doc["_id"]["status"]] = doc["count"]
+    return stats
+
+async def load_stats(db, project_id: str) -> Dict:
+    """Running aggregates for a project, computed on first use"""
+    doc = await db[STATS_COLLECTION].find_one({"_id": project_id})
+    if doc is not None:
+        return doc
+    doc = (await _compute(db, {"project_id": project_id})).get(project_id, _empty())
+    await db[STATS_COLLECTION].update_one({"_id": project_id}, {"$setOnInsert": doc}, upsert=True)
+    return doc
+
+async def reconcile_stats(db):
+    """Recompute every project's aggregates from the source collections"""
+    stats = await _compute(db, {})
+    if stats:
+        await db[STATS_COLLECTION].bulk_write(
+            [UpdateOne({"_id": project_id}, {"$set": doc}, upsert=True) for project_id, doc in stats.items()],
+            ordered=False
+        )
+    await db[STATS_COLLECTION].delete_many({"_id": {"$nin": list(stats)}})
@@ -0,0 +1,70 @@
+from typing import Dict
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+# Legacy comments fixed per bulk write during the backfill
+BACKFILL_BATCH_SIZE = 1000
+
+async def thread_root(db, comment: Dict) -> str:
+    """Id of the top-level comment of ``comment``'s thread.
+
+    Comments written before ``root_comment_id`` existed don't carry it, so
+    their parent chain is walked until a comment that does (or a top-level
+    comment) is found.
+    """
+    seen = set()
+    while not comment.get("root_comment_id") and comment.get("parent_comment_id"):
+        parent_id = comment["parent_comment_id"]
+        if parent_id in seen or not ObjectId.is_valid(parent_id):
+            break
+        seen.add(parent_id)
+        parent = await db["comments"].find_one(
+            {"_id": ObjectId(parent_id)}, {"parent_comment_id": 1, "root_comment_id": 1}
+        )
+        if parent is None:
+            # Orphaned reply: its missing parent is the closest thing to a root
+            return parent_id
+        comment = parent
+    return comment.get("root_comment_id") or str(comment["_id"])
+
+async def backfill_comment_roots(db) -> int:
+    """Set ``root_comment_id`` on comments written before it existed.
+
+    Loads the legacy comments' parent links, resolves each chain in memory
+    (stopping at comments that already have a root), and writes the roots
+    in batches. Returns the number of comments updated.
+    """
+    comments = db["comments"]
+    parents = {
+        str(doc["_id"]): doc.get("parent_comment_id")
+        async for doc in comments.find({"root_comment_id": None}, {"parent_comment_id": 1})
+    }
+    if not parents:
+        return 0
+
+    # Roots of already-migrated comments that legacy replies point at
+    referenced = [ObjectId(p) for p in set(parents.values()) if p and p not in parents and ObjectId.is_valid(p)]
+    roots = {
+        str(doc["_id"]): doc["root_comment_id"]
+        async for doc in comments.find({"_id": {"$in": referenced}, "root_comment_id": {"$ne": None}},
+                                       {"root_comment_id": 1})
+    }
+
+    def resolve(comment_id: str) -> str:
+        chain = []
+        while comment_id not in roots and parents.get(comment_id) and len(chain) <= len(parents):
+            chain.append(comment_id)
+            comment_id = parents[comment_id]
+        root = roots.get(comment_id, comment_id)
+        for link in chain:
+            roots[link] = root
+        return root
+
+    operations = [
+        UpdateOne({"_id": ObjectId(comment_id)}, {"$set": {"root_comment_id": resolve(comment_id)}})
+        for comment_id in parents
+    ]
+    for start in range(0, len(operations), BACKFILL_BATCH_SIZE):
+        await comments.bulk_write(operations[start:start + BACKFILL_BATCH_SIZE], ordered=False)
+    return len(operations)
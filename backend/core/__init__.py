@@ -0,0 +1 @@
+# Core package 
\ No newline at end of file
@@ -0,0 +1,153 @@
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import time
+from typing import Dict, Optional
+
+from fastapi import HTTPException, Request
+
+# Lower value is admitted first; chosen per request with the X-Priority header
+PRIORITIES = {"interactive": 0, "batch": 1}
+PRIORITY_HEADER = "X-Priority"
+
+class AdmissionController:
+    """Concurrency limit with a bounded priority wait queue.
+
+    At most ``limit`` requests run at once. Others wait, highest priority
+    first, until a slot frees up or their class's deadline passes (503).
+    When ``queue_size`` requests are already waiting, new ones are
+    rejected immediately (429). Both carry a Retry-After estimate.
+    """
+
+    def __init__(self, name: str, limit: int, queue_size: int, max_wait: Dict[str, float]):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self._active = 0
+        self._waiters = []
+        self._queued = 0
+        self._seq = itertools.count()
+        self.counters = {"admitted": 0, "rejected": 0, "timed_out": 0, "wait_ms_sum": 0.0, "wait_ms_max": 0.0}
+
+    def _retry_after(self) -> str:
+        admitted = self.counters["admitted"]
+        average_wait = self.counters["wait_ms_sum"] / admitted / 1000 if admitted else 1.0
+        return str(max(1, math.ceil(average_wait)))
+
+    def _record_wait(self, started: float):
+        waited = (time.monotonic() - started) * 1000
+        self.counters["admitted"] += 1
+        self.counters["wait_ms_sum"] += waited
+        self.counters["wait_ms_max"] = max(self.counters["wait_ms_max"], waited)
+
+    async def acquire(self, priority: str):
+        started = time.monotonic()
+        if self._active < self.limit and not self._queued:
+            self._active += 1
+            self._record_wait(started)
+            return
+        if self._queued >= self.queue_size:
+            self.counters["rejected"] += 1
+            raise HTTPException(
+                status_code=429,
+                detail=f"Too many queued {self.name} requests",
+                headers={"Retry-After": self._retry_after()}
+            )
+        
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (PRIORITIES[priority], next(self._seq), waiter))
+        self._queued += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.max_wait[priority])
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done():
+                # The slot was handed over just as we gave up; pass it on
+                self.release()
+            else:
+                waiter.cancel()
+                self._queued -= 1
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.counters["timed_out"] += 1
+            raise HTTPException(
+                status_code=503,
+                detail=f"Timed out waiting for a {self.name} slot",
+                headers={"Retry-After": self._retry_after()}
+            )
+        self._record_wait(started)
+
+    def release(self):
+        """Hand the slot to the best waiting request, or free it"""
+        while self._waiters:
+            _, _, waiter = heapq.heappop(self._waiters)
+            if waiter.cancelled():
+                continue
+            self._queued -= 1
+            waiter.set_result(None)
+            return
+        self._active -= 1
+
+    def stats(self) -> Dict:
+        admitted = self.counters["admitted"]
+        return {
+            "limit": self.limit,
+            "active": self._active,
+            "queued": self._queued,
+            **self.counters,
+            "wait_ms_avg": self.counters["wait_ms_sum"] / admitted if admitted else 0.0,
+        }
+
+def controller_from_env(name: str, limit: int, queue_size: int = 32) -> AdmissionController:
+    """Controller configured by ``<NAME>_CONCURRENCY``, ``<NAME>_QUEUE_SIZE`` and ``<NAME>_MAX_WAIT_SECONDS``"""
+    prefix = name.upper()
+    interactive_wait = float(os.getenv(f"{prefix}_MAX_WAIT_SECONDS", "5"))
+    return AdmissionController(
+        name,
+        limit=int(os.getenv(f"{prefix}_CONCURRENCY", str(limit))),
+        queue_size=int(os.getenv(f"{prefix}_QUEUE_SIZE", str(queue_size))),
+        # Batch work tolerates longer waits but is always admitted after interactive work
+        max_wait={"interactive": interactive_wait, "batch": interactive_wait * 6},
+    )
+
+class _Slot:
+    """A held slot; releasing it more than once is a no-op"""
+
+    def __init__(self, controller: Optional[AdmissionController]):
+        self.controller = controller
+        self.held = controller is not None
+
+    def release(self):
+        if self.held:
+            self.held = False
+            self.controller.release()
+
+def detach_admission(request: Request) -> _Slot:
+    """Take the request's slot so the caller decides when it is released.
+
+    Used for work that can outlive the request, such as a coalesced
+    computation other requests are waiting on: the slot is then released
+    when that work finishes, not when the request that started it ends.
+    Requests without a slot get one that is already released.
+    """
+    slot = getattr(request.state, "admission_slot", None)
+    request.state.admission_slot = None
+    return slot or _Slot(None)
+
+def admission(controller: AdmissionController):
+    """Router dependency holding a slot of ``controller`` for the whole request"""
+    async def dependency(request: Request):
+        priority = request.headers.get(PRIORITY_HEADER, "interactive").lower()
+        if priority not in PRIORITIES:
+            raise HTTPException(status_code=400, detail=f"{PRIORITY_HEADER} must be one of: {', '.join(PRIORITIES)}")
+        await controller.acquire(priority)
+        request.state.admission_slot = _Slot(controller)
+        try:
+            yield
+        finally:
+            # None once a handler has detached the slot
+            if request.state.admission_slot is not None:
+                request.state.admission_slot.release()
+    return dependency
@@ -0,0 +1,18 @@
+import os
+from datetime import datetime
+
+from .batch_writer import BatchWriter
+
+class AuditLogger(BatchWriter):
+    """Write-behind audit log; request handlers never wait on audit writes"""
+
+    def __init__(self):
+        super().__init__(
+            "audit_logs",
+            max_batch=int(os.getenv("AUDIT_LOG_BATCH_SIZE", "500")),
+            flush_interval=float(os.getenv("AUDIT_LOG_FLUSH_SECONDS", "1.0")),
+            max_queue=int(os.getenv("AUDIT_LOG_QUEUE_SIZE", "10000")),
+        )
+
+    def log(self, action: str, **fields) -> bool:
+        return self.submit({"action": action, **fields, "timestamp": datetime.utcnow()})
@@ -0,0 +1,103 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+class BatchWriter:
+    """Write-behind buffer that inserts documents with ``insert_many``.
+
+    ``submit`` never waits on the database: documents go into a bounded
+    in-process queue (and are dropped, and counted, when it is full). A
+    background task flushes a batch once it reaches ``max_batch``
+    documents or ``flush_interval`` seconds after its first document.
+    ``stop`` drains everything still queued.
+    """
+
+    def __init__(self, collection: str, max_batch: int = 500, flush_interval: float = 1.0,
+                 max_queue: int = 10000,
+                 on_flush: Optional[Callable[[object, List[Dict]], Awaitable[None]]] = None):
+        self.collection = collection
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.on_flush = on_flush
+        self._queue = asyncio.Queue(maxsize=max_queue)
+        self._task = None
+        self._db = None
+        self._closed = False
+        self.counters = {"enqueued": 0, "written": 0, "dropped": 0, "failed": 0, "flushes": 0}
+
+    def start(self, db):
+        self._db = db
+        self._closed = False
+        self._task = asyncio.create_task(self._run())
+
+    def submit(self, doc: Dict) -> bool:
+        """Queue one document; returns False if it had to be dropped"""
+        if self._closed:
+            self.counters["dropped"] += 1
+            return False
+        try:
+            self._queue.put_nowait(doc)
+        except asyncio.QueueFull:
+            self.counters["dropped"] += 1
+            return False
+        self.counters["enqueued"] += 1
+        return True
+
+    def submit_many(self, docs: Iterable[Dict]) -> int:
+        return sum(self.submit(doc) for doc in docs)
+
+    def stats(self) -> Dict[str, int]:
+        return {**self.counters, "queued": self._queue.qsize()}
+
+    async def _write(self, batch: List[Dict]):
+        try:
+            await self._db[self.collection].insert_many(batch, ordered=False)
+        except Exception:
+            self.counters["failed"] += len(batch)
+            logger.exception("Failed to write %d documents to %s", len(batch), self.collection)
+            return
+        self.counters["written"] += len(batch)
+        self.counters["flushes"] += 1
+        if self.on_flush is not None:
+            try:
+                await self.on_flush(self._db, batch)
+            except Exception:
+                logger.exception("on_flush hook for %s failed", self.collection)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+            stopping = False
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._write(batch)
+            if stopping:
+                return
+
+    async def stop(self):
+        """Stop accepting documents and flush everything already queued"""
+        self._closed = True
+        if self._task is None:
+            return
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
@@ -0,0 +1,33 @@
+from typing import Dict, Iterable, List, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo.errors import BulkWriteError
+
+def parse_object_ids(ids: Iterable[str]) -> Tuple[List[ObjectId], List[str]]:
+    """Split id strings into valid ObjectIds (in order, de-duplicated) and invalid ones"""
+    valid, invalid, seen = [], [], set()
+    for raw in ids:
+        try:
+            oid = ObjectId(raw)
+        except (InvalidId, TypeError):
+            invalid.append(raw)
+            continue
+        if oid not in seen:
+            seen.add(oid)
+            valid.append(oid)
+    return valid, invalid
+
+async def unordered_bulk_write(collection, operations: List) -> Tuple[Dict, Dict[int, str]]:
+    """Run an unordered bulk_write that may partly fail.
+
+    Returns the server's counts (``nMatched``, ``nModified``, ``nRemoved``,
+    ...) and ``{operation index: error message}`` for the operations that
+    failed; every other operation was applied.
+    """
+    try:
+        result = await collection.bulk_write(operations, ordered=False)
+    except BulkWriteError as e:
+        failed = {err["index"]: err.get("errmsg", "Write failed") for err in e.details.get("writeErrors", [])}
+        return e.details, failed
+    return result.bulk_api_result, {}
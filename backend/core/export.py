@@ -0,0 +1,143 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Tuple
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+BATCH_SIZE = 1000
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# Column types understood by the Arrow/Parquet writers
+ARROW_TYPES = ("string", "int", "float", "bool", "timestamp")
+
+Columns = List[Tuple[str, str]]
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+def _csv_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return "" if value is None else value
+
+async def _batched(rows: AsyncIterator[Dict], size: int) -> AsyncIterator[List[Dict]]:
+    batch = []
+    async for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+async def _ndjson(rows, columns):
+    async for batch in _batched(rows, BATCH_SIZE):
+        yield "".join(json.dumps(row, default=_json_default) + "\n" for row in batch).encode()
+
+async def _csv(rows, columns):
+    names = [name for name, _ in columns]
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=names, extrasaction="ignore")
+    writer.writeheader()
+    yield buffer.getvalue().encode()
+    async for batch in _batched(rows, BATCH_SIZE):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows({k: _csv_value(row.get(k)) for k in names} for row in batch)
+        yield buffer.getvalue().encode()
+
+class _ChunkSink:
+    """Write-only file that hands out what was written since the last drain.
+
+    ``tell`` reports the total bytes written, which the Parquet writer
+    relies on for the offsets in its footer.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self):
+        return True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+def _arrow_schema(pa, columns: Columns):
+    types = {
+        "string": pa.string(),
+        "int": pa.int64(),
+        "float": pa.float64(),
+        "bool": pa.bool_(),
+        "timestamp": pa.timestamp("ms"),
+    }
+    return pa.schema([(name, types[kind]) for name, kind in columns])
+
+async def _arrow(rows, columns, parquet: bool):
+    import pyarrow as pa
+
+    schema = _arrow_schema(pa, columns)
+    sink = _ChunkSink()
+    if parquet:
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema)
+    else:
+        writer = pa.ipc.new_stream(pa.PythonFile(sink, mode="w"), schema)
+    async for batch in _batched(rows, BATCH_SIZE):
+        writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+def streaming_export(rows: AsyncIterator[Dict], columns: Columns, fmt: str, filename: str) -> StreamingResponse:
+    """Stream flat rows as NDJSON, CSV, Arrow IPC or Parquet.
+
+    ``rows`` is consumed lazily in batches, so memory stays flat however
+    many rows there are. Arrow and Parquet need the optional ``pyarrow``.
+    """
+    if fmt not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(MEDIA_TYPES)}")
+    if fmt == "ndjson":
+        body = _ndjson(rows, columns)
+    elif fmt == "csv":
+        body = _csv(rows, columns)
+    else:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=501, detail=f"{fmt} export requires pyarrow")
+        body = _arrow(rows, columns, parquet=fmt == "parquet")
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'}
+    )
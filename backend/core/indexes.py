@@ -0,0 +1,151 @@
+"""Index registry: every module declares the indexes its routes rely on.
+
+Modules may also list superseded index names in DROPPED_INDEXES
+({collection: [name]}); they are dropped before the registered indexes
+are created.
+
+Indexes are ensured at startup, or by hand (from the backend directory):
+
+    python -m core.indexes
+    python -m core.indexes --check
+
+``--check`` also runs ``explain`` on each module's representative
+queries against ``MONGODB_URL`` and exits non-zero if any of them is
+planned as a collection scan.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+from importlib import import_module
+from typing import Dict, List
+
+from pymongo import IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# Server error codes: an index exists with the same name but other options;
+# a dropped index does not exist
+INDEX_OPTIONS_CONFLICT = 85
+INDEX_NOT_FOUND = 27
+
+# Modules exposing INDEXES ({collection: [IndexModel]}), QUERIES and optionally DROPPED_INDEXES
+MODULES = [
+    "auth.indexes",
+    "collaboration.indexes",
+    "employees.indexes",
+]
+
+def registered_indexes() -> Dict[str, List[IndexModel]]:
+    indexes = {}
+    for name in MODULES:
+        for collection, models in import_module(name).INDEXES.items():
+            indexes.setdefault(collection, []).extend(models)
+    return indexes
+
+def dropped_indexes() -> Dict[str, List[str]]:
+    dropped = {}
+    for name in MODULES:
+        for collection, names in getattr(import_module(name), "DROPPED_INDEXES", {}).items():
+            dropped.setdefault(collection, []).extend(names)
+    return dropped
+
+def registered_queries() -> List[tuple]:
+    return [query for name in MODULES for query in getattr(import_module(name), "QUERIES", [])]
+
+async def _create_index(db, collection: str, model: IndexModel):
+    try:
+        await db[collection].create_indexes([model])
+    except OperationFailure as e:
+        if e.code != INDEX_OPTIONS_CONFLICT or "expireAfterSeconds" not in model.document:
+            raise
+        # Retention changed: update the existing TTL index in place
+        await db.command(
+            "collMod", collection,
+            index={"name": model.document["name"], "expireAfterSeconds": model.document["expireAfterSeconds"]}
+        )
+
+async def _drop_index(db, collection: str, name: str):
+    try:
+        await db[collection].drop_index(name)
+        logger.info("Dropped index %s on %s", name, collection)
+    except OperationFailure as e:
+        if e.code != INDEX_NOT_FOUND and "not found" not in str(e):
+            raise
+
+async def ensure_indexes(db):
+    """Drop superseded indexes, then create every registered index.
+
+    A failing index is logged, not fatal.
+    """
+    for collection, names in dropped_indexes().items():
+        for name in names:
+            try:
+                await _drop_index(db, collection, name)
+            except Exception:
+                logger.exception("Could not drop index %s on %s", name, collection)
+    for collection, models in registered_indexes().items():
+        for model in models:
+            try:
+                await _create_index(db, collection, model)
+            except Exception:
+                logger.exception("Could not create index %s on %s", model.document.get("name"), collection)
+
+def _stages(plan):
+    """Every stage name in an explain plan tree"""
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from _stages(value)
+
+async def find_collection_scans(db) -> List[tuple]:
+    """Registered queries whose winning plan contains a COLLSCAN"""
+    scans = []
+    for collection, query, sort in registered_queries():
+        command = {"find": collection, "filter": query}
+        if sort:
+            command["sort"] = dict(sort)
+        explain = await db.command("explain", command, verbosity="queryPlanner")
+        winning = explain["queryPlanner"]["winningPlan"]
+        if "COLLSCAN" in set(_stages(winning)):
+            scans.append((collection, query, sort))
+    return scans
+
+async def _run(url: str, database: str, check: bool) -> int:
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(url)
+    try:
+        db = client[database]
+        await ensure_indexes(db)
+        if not check:
+            return 0
+        scans = await find_collection_scans(db)
+    finally:
+        client.close()
+    for collection, query, sort in scans:
+        print(f"COLLSCAN {collection} filter={query} sort={sort}")
+    print(f"{len(registered_queries())} queries checked, {len(scans)} collection scans")
+    return 1 if scans else 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ensure registered indexes and verify query plans")
+    parser.add_argument("--check", action="store_true", help="Fail if any registered query does a COLLSCAN")
+    parser.add_argument("--database", default="team_optimizer")
+    args = parser.parse_args(argv)
+
+    from dotenv import load_dotenv
+    load_dotenv()
+    url = os.getenv("MONGODB_URL")
+    if not url:
+        parser.error("MONGODB_URL environment variable not set")
+    return asyncio.run(_run(url, args.database, args.check))
+
+if __name__ == "__main__":
+    sys.exit(main())
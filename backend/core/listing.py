@@ -0,0 +1,35 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Response
+
+from .pagination import clamp_limit, decode_cursor, encode_cursor, keyset_filter
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def parse_fields(fields: Optional[str], allowed: List[str]) -> Optional[Dict]:
+    """Turn ``fields=name,department`` into a Mongo projection (None = all fields)"""
+    if not fields:
+        return None
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = sorted(set(requested) - set(allowed))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return {f: 1 for f in requested}
+
+async def list_page(collection, query: Dict, projection: Optional[Dict], cursor: Optional[str],
+                    limit: int, response: Response, sort: Sequence[Tuple[str, int]] = (("_id", 1),)) -> List[Dict]:
+    """Fetch one page in ``sort`` order and set the next-cursor header.
+
+    Each page is a bounded index range scan after the previous page's last
+    sort key, so the cost per page is constant however deep the client goes.
+    ``sort`` must end in ``_id`` so the key is unique.
+    """
+    limit = clamp_limit(limit)
+    if cursor:
+        query = {**query, **keyset_filter(sort, decode_cursor(cursor))}
+    if projection is not None:
+        projection = {**projection, **{field: 1 for field, _ in sort}}
+    docs = await collection.find(query, projection).sort(list(sort)).limit(limit).to_list(limit)
+    if len(docs) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(*(docs[-1].get(field) for field, _ in sort))
+    return docs
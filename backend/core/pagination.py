@@ -0,0 +1,54 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Sequence, Tuple
+
+from bson import ObjectId
+from fastapi import HTTPException
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, ObjectId):
+        return {"$oid": str(value)}
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    return value
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and "$oid" in value:
+        return ObjectId(value["$oid"])
+    if isinstance(value, dict) and "$date" in value:
+        return datetime.fromisoformat(value["$date"])
+    return value
+
+def encode_cursor(*values: Any) -> str:
+    """Opaque, URL-safe token for the sort key of the last item on a page"""
+    raw = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(token: str) -> List[Any]:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        return [_decode_value(v) for v in json.loads(base64.urlsafe_b64decode(padded))]
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def keyset_filter(sort: Sequence[Tuple[str, int]], values: Sequence[Any]) -> Dict:
+    """Filter selecting documents strictly after ``values`` in ``sort`` order.
+
+    For ``[("created_at", -1), ("_id", -1)]`` this expands to
+    ``created_at < v0 OR (created_at == v0 AND _id < v1)``.
+    """
+    if len(values) != len(sort):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    clauses = []
+    for i, (field, direction) in enumerate(sort):
+        clause = {f: values[j] for j, (f, _) in enumerate(sort[:i])}
+        clause[field] = {"$gt" if direction > 0 else "$lt": values[i]}
+        clauses.append(clause)
+    return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+def clamp_limit(limit: int) -> int:
+    return max(1, min(limit, MAX_PAGE_SIZE))
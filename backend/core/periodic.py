@@ -0,0 +1,47 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+async def run_periodically(interval: float, job, *args):
+    """Await ``job(*args)`` every ``interval`` seconds until cancelled"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await job(*args)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Periodic job %s failed", getattr(job, "__name__", job))
+
+async def _run_once(job, *args):
+    try:
+        await job(*args)
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        logger.exception("Background job %s failed", getattr(job, "__name__", job))
+
+def start_once(app, job, *args):
+    """Run a one-off job (e.g. a data backfill) in the background; cancelled like periodic jobs"""
+    if not hasattr(app, "background_tasks"):
+        app.background_tasks = []
+    task = asyncio.create_task(_run_once(job, *args))
+    app.background_tasks.append(task)
+    return task
+
+def start_periodic(app, interval: float, job, *args):
+    """Schedule a periodic job that is cancelled in the shutdown hook"""
+    if not hasattr(app, "background_tasks"):
+        app.background_tasks = []
+    task = asyncio.create_task(run_periodically(interval, job, *args))
+    app.background_tasks.append(task)
+    return task
+
+async def stop_periodic(app):
+    """Cancel every job started with start_periodic"""
+    tasks = getattr(app, "background_tasks", [])
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    tasks.clear()
@@ -0,0 +1,102 @@
+import hashlib
+import logging
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Dict, Optional, Set, Tuple
+
+from fastapi import Request, Response
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+REVISIONS_COLLECTION = "revisions"
+
+# Per-document revision fields, set on every write
+REVISION_FIELDS = {"_rev": 1, "updated_at": 1, "created_at": 1}
+
+# Collections whose last bump failed; retried before their revision is next read
+_unbumped: Set[str] = set()
+
+def revision_update(update_data: Dict, now: datetime = None) -> Dict:
+    """``$set`` ``update_data`` and bump the document's revision"""
+    return {"$set": {**update_data, "updated_at": now or datetime.utcnow()}, "$inc": {"_rev": 1}}
+
+async def bump_revision(db, collection: str) -> Optional[Dict]:
+    """Advance a collection's revision counter after a write.
+
+    The data write has already committed, so a failure here is logged rather
+    than turned into a 500, and the bump is retried on the next revision
+    read so validators never stay stale.
+    """
+    try:
+        doc = await db[REVISIONS_COLLECTION].find_one_and_update(
+            {"_id": collection},
+            {"$inc": {"rev": 1}, "$set": {"updated_at": datetime.utcnow()}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    except PyMongoError:
+        logger.warning("Failed to bump the %s revision; retrying on next read", collection, exc_info=True)
+        _unbumped.add(collection)
+        return None
+    _unbumped.discard(collection)
+    return doc
+
+async def _retry_unbumped(db, collections) -> None:
+    for collection in [c for c in collections if c in _unbumped]:
+        await bump_revision(db, collection)
+
+async def revision_tag(db, *collections: str) -> Tuple[int, ...]:
+    """Current revisions of several collections in one read, in argument order"""
+    await _retry_unbumped(db, collections)
+    revs = {doc["_id"]: doc["rev"] async for doc in db[REVISIONS_COLLECTION].find({"_id": {"$in": list(collections)}})}
+    return tuple(revs.get(c, 0) for c in collections)
+
+async def current_revision(db, collection: str) -> Dict:
+    await _retry_unbumped(db, (collection,))
+    doc = await db[REVISIONS_COLLECTION].find_one({"_id": collection})
+    return doc or {"rev": 0, "updated_at": None}
+
+def _http_date(value: Optional[datetime]) -> Optional[str]:
+    if value is None:
+        return None
+    return format_datetime(value.replace(tzinfo=timezone.utc), usegmt=True)
+
+def _matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return etag in candidates
+
+def _conditional(request: Request, response: Response, etag: str,
+                 last_modified: Optional[datetime]) -> Optional[Response]:
+    headers = {"ETag": etag}
+    if last_modified is not None:
+        headers["Last-Modified"] = _http_date(last_modified)
+    if _matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+async def list_not_modified(request: Request, response: Response, collection: str) -> Optional[Response]:
+    """Set list validators; return a 304 if the client's copy is current.
+
+    The ETag combines the collection revision with the query string, so a
+    poll that matches costs one small read and never touches the listed
+    documents.
+    """
+    state = await current_revision(request.app.mongodb, collection)
+    digest = hashlib.sha1(str(request.url.query).encode()).hexdigest()[:16]
+    return _conditional(request, response, f'"{collection}.{state["rev"]}.{digest}"', state["updated_at"])
+
+def document_etag(doc: Dict) -> str:
+    return f'"{doc["_id"]}.{doc.get("_rev", 0)}"'
+
+def document_not_modified(request: Request, response: Response, doc: Dict) -> Optional[Response]:
+    """Set detail validators from a document (or its REVISION_FIELDS projection)"""
+    return _conditional(request, response, document_etag(doc), doc.get("updated_at") or doc.get("created_at"))
@@ -0,0 +1,53 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+class SingleFlight:
+    """Coalesce concurrent identical calls into one shared computation.
+
+    Keys are tuples starting with the route name, followed by the request
+    parameters and the revision of the data the result depends on. While
+    a call for a key is in flight, later callers await the same task
+    instead of starting their own. Each caller awaits it through
+    ``asyncio.shield``, so a disconnecting client never cancels the work
+    others are waiting on.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, route: str, outcome: str):
+        counters = self._counters.setdefault(route, {"executed": 0, "coalesced": 0})
+        counters[outcome] += 1
+
+    def _done(self, key: Tuple, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # Retrieved here so an unawaited failure is not logged
+
+    async def do(self, key: Tuple, fn: Callable[..., Awaitable], *args,
+                 on_coalesce: Optional[Callable[[], None]] = None,
+                 on_finish: Optional[Callable[[], None]] = None):
+        """Await ``fn(*args)``, or the in-flight call with the same key.
+
+        ``on_coalesce`` runs when joining an existing call, before waiting.
+        ``on_finish`` runs when a call this caller started finishes, even
+        if the caller has stopped waiting for it.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(fn(*args))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+            if on_finish is not None:
+                task.add_done_callback(lambda t: on_finish())
+            self._count(key[0], "executed")
+        else:
+            self._count(key[0], "coalesced")
+            if on_coalesce is not None:
+                on_coalesce()
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict:
+        return {"in_flight": len(self._inflight), "routes": {r: dict(c) for r, c in self._counters.items()}}
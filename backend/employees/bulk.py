@@ -0,0 +1,74 @@
+import csv
+import json
+from typing import AsyncIterator, Dict, List, Tuple
+
+from pydantic import ValidationError
+
+from .models import EmployeeCreate
+
+CHUNK_SIZE = 500
+
+CSV_COLUMNS = ["name", "email", "gender", "department", "skills"]
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Split a streamed request body into lines without buffering all of it.
+
+    Lines stay undecoded so that invalid UTF-8 fails only its own row.
+    """
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line.rstrip(b"\r")
+    if pending:
+        yield pending.rstrip(b"\r")
+
+def parse_csv_skills(value: str) -> List[Dict]:
+    """Parse ``python:senior;react`` into skill dicts"""
+    skills = []
+    for item in (value or "").split(";"):
+        name, _, level = item.strip().partition(":")
+        if name.strip():
+            skills.append({"name": name.strip(), "level": level.strip() or None})
+    return skills
+
+async def iter_rows(lines: AsyncIterator[bytes], fmt: str) -> AsyncIterator[Tuple[int, Dict]]:
+    """Yield (row number, raw row) pairs; unparseable rows yield an exception.
+
+    CSV input needs a header row and one record per line; the ``skills``
+    column uses ``name:level`` pairs separated by ``;``.
+    """
+    header = None
+    row_number = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        if fmt == "csv" and header is None:
+            header = [h.strip() for h in next(csv.reader([line.decode("utf-8", errors="replace")]))]
+            continue
+        row_number += 1
+        try:
+            line = line.decode("utf-8")
+            if fmt == "csv":
+                values = dict(zip(header, next(csv.reader([line]))))
+                row = {k: (values.get(k) or None) for k in CSV_COLUMNS if k != "skills"}
+                row["skills"] = parse_csv_skills(values.get("skills", ""))
+            else:
+                row = json.loads(line)
+            yield row_number, row
+        except Exception as e:
+            yield row_number, e
+
+def validate_row(row) -> Tuple[Dict, str]:
+    """Return (employee document, None) or (None, error message)"""
+    if isinstance(row, UnicodeDecodeError):
+        return None, "invalid UTF-8"
+    if isinstance(row, Exception):
+        return None, f"Unparseable row: {row}"
+    try:
+        return EmployeeCreate.model_validate(row).model_dump(), None
+    except ValidationError as e:
+        return None, "; ".join(
+            f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()
+        )
@@ -0,0 +1,21 @@
+from pymongo import ASCENDING, IndexModel
+
+# Indexes backing the employee list filters; each ends in _id for keyset paging
+INDEXES = {
+    "employees": [
+        IndexModel([("skills.name", ASCENDING), ("skills.level", ASCENDING), ("_id", ASCENDING)]),
+        IndexModel([("skills.level", ASCENDING), ("_id", ASCENDING)]),
+        IndexModel([("department", ASCENDING), ("_id", ASCENDING)]),
+        IndexModel([("gender", ASCENDING), ("_id", ASCENDING)]),
+    ]
+}
+
+# Representative route queries as (collection, filter, sort), checked by core.indexes
+QUERIES = [
+    ("employees", {}, [("_id", ASCENDING)]),
+    ("employees", {"skills": {"$elemMatch": {"name": "python", "level": "senior"}}}, [("_id", ASCENDING)]),
+    ("employees", {"skills.name": "python"}, [("_id", ASCENDING)]),
+    ("employees", {"skills.level": "senior"}, [("_id", ASCENDING)]),
+    ("employees", {"department": "Engineering"}, [("_id", ASCENDING)]),
+    ("employees", {"gender": "female"}, [("_id", ASCENDING)]),
+]
@@ -36,4 +36,41 @@ class EmployeeOut(BaseModel):
     skills: List[Skill]
     gender: Optional[str] = None
     department: Optional[str] = None
-    created_at: Optional[datetime] = None 
\ No newline at end of file
+    created_at: Optional[datetime] = None
+
+class EmployeeListItem(BaseModel):
+    """Employee as returned by the list endpoint, which may project fields"""
+    id: str
+    name: Optional[str] = None
+    email: Optional[str] = None
+    skills: Optional[List[Skill]] = None
+    gender: Optional[str] = None
+    department: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+class BulkImportError(BaseModel):
+    row: int
+    error: str
+
+class BulkImportResult(BaseModel):
+    inserted: int
+    failed: int
+    errors: List[BulkImportError]
+
+class EmployeeBulkUpdate(EmployeeUpdate):
+    id: str
+
+class BulkDeleteRequest(BaseModel):
+    ids: List[str]
+
+class BulkWriteFailure(BaseModel):
+    id: str
+    error: str
+
+class BulkWriteSummary(BaseModel):
+    matched: int = 0
+    modified: int = 0
+    deleted: int = 0
+    invalid_ids: List[str] = []
+    not_found: List[str] = []
+    failed: List[BulkWriteFailure] = []
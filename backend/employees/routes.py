@@ -1,29 +1,250 @@
-from fastapi import APIRouter, HTTPException, Request
-from .models import EmployeeCreate, EmployeeUpdate, EmployeeOut
+from fastapi import APIRouter, HTTPException, Request, Response
+from .models import (
+    EmployeeCreate, EmployeeUpdate, EmployeeOut, EmployeeListItem,
+    BulkImportError, BulkImportResult, EmployeeBulkUpdate, BulkDeleteRequest, BulkWriteFailure, BulkWriteSummary
+)
+from .bulk import CHUNK_SIZE, iter_lines, iter_rows, validate_row
+from analytics.aggregations import STATS_PROJECTION, add_employee, empty_stats
+from analytics.rollups import apply_employee_change, apply_rollup_delta
+from optimization.embeddings import employee_skill_text, encode, is_loaded as embeddings_loaded
+from core.bulk import parse_object_ids, unordered_bulk_write
+from core.listing import list_page, parse_fields
+from core.pagination import MAX_PAGE_SIZE
+from core.revisions import (
+    REVISION_FIELDS, bump_revision, document_not_modified, list_not_modified, revision_update
+)
 from bson import ObjectId
+from pymongo import DeleteOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
 from datetime import datetime
-from typing import List
+from typing import Dict, List, Optional, Tuple
+import asyncio
 
 router = APIRouter()
 
-@router.get("/", response_model=List[EmployeeOut])
-async def get_employees(request: Request):
+LIST_FIELDS = ["name", "email", "skills", "gender", "department", "created_at"]
+
+@router.get("/", response_model=List[EmployeeListItem], response_model_exclude_unset=True)
+async def get_employees(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = MAX_PAGE_SIZE,
+    fields: Optional[str] = None,
+    skill: Optional[str] = None,
+    level: Optional[str] = None,
+    department: Optional[str] = None,
+    gender: Optional[str] = None
+):
+    """List employees a page at a time (next page token in X-Next-Cursor)"""
     db = request.app.mongodb["employees"]
-    employees = await db.find().to_list(1000)
+    projection = parse_fields(fields, LIST_FIELDS)
+    not_modified = await list_not_modified(request, response, "employees")
+    if not_modified:
+        return not_modified
+    
+    # Server-side filters, each backed by an (<field>, _id) index
+    query = {}
+    if skill and level:
+        query["skills"] = {"$elemMatch": {"name": skill, "level": level}}
+    elif skill:
+        query["skills.name"] = skill
+    elif level:
+        query["skills.level"] = level
+    if department:
+        query["department"] = department
+    if gender:
+        query["gender"] = gender
+    
+    employees = await list_page(db, query, projection, cursor, limit, response)
     result = []
     for emp in employees:
-        # Handle missing created_at field for existing data
-        if "created_at" not in emp:
-            emp["created_at"] = None
-        result.append(EmployeeOut(id=str(emp["_id"]), **emp))
+        # Every requested field is present, even if missing in older documents
+        values = {f: emp.get(f) for f in (projection or LIST_FIELDS)}
+        result.append(EmployeeListItem(id=str(emp["_id"]), **values))
     return result
 
+async def _insert_batch(request: Request, batch) -> Tuple[List[Dict], List[BulkImportError]]:
+    """Insert one chunk of validated rows with a single unordered insert_many"""
+    docs = [doc for _, doc in batch]
+    now = datetime.utcnow()
+    for doc in docs:
+        doc["created_at"] = now
+        doc["updated_at"] = now
+        doc["_rev"] = 1
+    
+    failed = {}
+    try:
+        await request.app.mongodb["employees"].insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        failed = {err["index"]: err.get("errmsg", "Write failed") for err in e.details.get("writeErrors", [])}
+    inserted = [doc for i, doc in enumerate(docs) if i not in failed]
+    
+    # One summary audit record per batch (write-behind)
+    request.app.audit_logger.log(
+        "bulk_create_employees",
+        employee_ids=[str(doc["_id"]) for doc in inserted],
+        count=len(inserted)
+    )
+    
+    return inserted, [BulkImportError(row=batch[i][0], error=msg) for i, msg in sorted(failed.items())]
+
+@router.post("/bulk", response_model=BulkImportResult)
+async def bulk_import_employees(request: Request, format: Optional[str] = None):
+    """Import employees from a streamed NDJSON or CSV upload.
+    
+    The format defaults from the Content-Type header. Rows are validated
+    and inserted in chunks; the response lists every rejected row.
+    """
+    fmt = format or ("csv" if "csv" in request.headers.get("content-type", "") else "ndjson")
+    if fmt not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'csv'")
+    
+    inserted = 0
+    errors = []
+    delta = empty_stats()
+    skill_texts = set()
+    batch = []
+    
+    async def flush():
+        nonlocal inserted
+        docs, batch_errors = await _insert_batch(request, batch)
+        inserted += len(docs)
+        errors.extend(batch_errors)
+        for doc in docs:
+            add_employee(delta, doc)
+            skill_texts.add(employee_skill_text(doc))
+            skill_texts.update(s["name"] for s in doc.get("skills", []))
+        batch.clear()
+    
+    async for row_number, row in iter_rows(iter_lines(request.stream()), fmt):
+        doc, error = validate_row(row)
+        if error:
+            errors.append(BulkImportError(row=row_number, error=error))
+            continue
+        batch.append((row_number, doc))
+        if len(batch) >= CHUNK_SIZE:
+            await flush()
+    if batch:
+        await flush()
+    
+    # Refresh derived state once for the whole import
+    if inserted:
+        await bump_revision(request.app.mongodb, "employees")
+    try:
+        await apply_rollup_delta(request.app.mongodb, delta)
+    except:
+        pass  # Reconciliation corrects any drift
+    if skill_texts and embeddings_loaded():
+        await asyncio.to_thread(encode, list(skill_texts))
+    
+    return BulkImportResult(inserted=inserted, failed=len(errors), errors=sorted(errors, key=lambda e: e.row))
+
+@router.patch("/bulk", response_model=BulkWriteSummary)
+async def bulk_update_employees(updates: List[EmployeeBulkUpdate], request: Request):
+    """Update many employees with one unordered bulk_write"""
+    db = request.app.mongodb["employees"]
+    valid_ids, invalid_ids = parse_object_ids(u.id for u in updates)
+    if not valid_ids:
+        return BulkWriteSummary(invalid_ids=invalid_ids)
+    
+    # Current state of every target, for the rollup delta (one round trip)
+    current = {doc["_id"]: doc async for doc in db.find({"_id": {"$in": valid_ids}}, STATS_PROJECTION)}
+    
+    operations = []
+    # (employee id, state before, state after) per operation, for the rollup delta
+    changes = []
+    now = datetime.utcnow()
+    for update in updates:
+        if update.id in invalid_ids:
+            continue
+        update_data = {k: v for k, v in update.model_dump(exclude={"id"}).items() if v is not None}
+        oid = ObjectId(update.id)
+        if not update_data or oid not in current:
+            continue
+        operations.append(UpdateOne({"_id": oid}, revision_update(update_data, now)))
+        before, current[oid] = current[oid], {**current[oid], **update_data}
+        changes.append((update.id, before, current[oid]))
+    
+    summary = BulkWriteSummary(
+        invalid_ids=invalid_ids,
+        not_found=[str(oid) for oid in valid_ids if oid not in current]
+    )
+    if not operations:
+        return summary
+    counts, failed = await unordered_bulk_write(db, operations)
+    summary.matched = counts.get("nMatched", 0)
+    summary.modified = counts.get("nModified", 0)
+    summary.failed = [BulkWriteFailure(id=changes[i][0], error=msg) for i, msg in sorted(failed.items())]
+    applied = [change for i, change in enumerate(changes) if i not in failed]
+    if not applied:
+        return summary
+    await bump_revision(request.app.mongodb, "employees")
+    
+    # Analytics rollup (optional) and audit log (write-behind), for the applied updates only
+    delta = empty_stats()
+    for _, before, after in applied:
+        add_employee(delta, before, -1)
+        add_employee(delta, after)
+    try:
+        await apply_rollup_delta(request.app.mongodb, delta)
+    except:
+        pass
+    for employee_id, _, _ in applied:
+        request.app.audit_logger.log("update_employee", employee_id=employee_id)
+    
+    return summary
+
+@router.delete("/bulk", response_model=BulkWriteSummary)
+async def bulk_delete_employees(body: BulkDeleteRequest, request: Request):
+    """Delete many employees with one unordered bulk_write"""
+    db = request.app.mongodb["employees"]
+    valid_ids, invalid_ids = parse_object_ids(body.ids)
+    if not valid_ids:
+        return BulkWriteSummary(invalid_ids=invalid_ids)
+    
+    existing = await db.find({"_id": {"$in": valid_ids}}, STATS_PROJECTION).to_list(None)
+    found = {doc["_id"] for doc in existing}
+    summary = BulkWriteSummary(
+        invalid_ids=invalid_ids,
+        not_found=[str(oid) for oid in valid_ids if oid not in found]
+    )
+    if not existing:
+        return summary
+    counts, failed = await unordered_bulk_write(db, [DeleteOne({"_id": doc["_id"]}) for doc in existing])
+    summary.deleted = counts.get("nRemoved", 0)
+    summary.failed = [BulkWriteFailure(id=str(existing[i]["_id"]), error=msg) for i, msg in sorted(failed.items())]
+    deleted = [doc for i, doc in enumerate(existing) if i not in failed]
+    if not deleted:
+        return summary
+    await bump_revision(request.app.mongodb, "employees")
+    
+    # Analytics rollup (optional) and audit log (write-behind), for the applied deletes only
+    delta = empty_stats()
+    for doc in deleted:
+        add_employee(delta, doc, -1)
+    try:
+        await apply_rollup_delta(request.app.mongodb, delta)
+    except:
+        pass
+    for doc in deleted:
+        request.app.audit_logger.log("delete_employee", employee_id=str(doc["_id"]))
+    
+    return summary
+
 @router.get("/{employee_id}", response_model=EmployeeOut)
-async def get_employee(employee_id: str, request: Request):
+async def get_employee(employee_id: str, request: Request, response: Response):
     db = request.app.mongodb["employees"]
+    if request.headers.get("if-none-match"):
+        # Revalidation reads only the revision fields
+        revision = await db.find_one({"_id": ObjectId(employee_id)}, REVISION_FIELDS)
+        not_modified = document_not_modified(request, response, revision) if revision else None
+        if not_modified:
+            return not_modified
     employee = await db.find_one({"_id": ObjectId(employee_id)})
     if not employee:
         raise HTTPException(status_code=404, detail="Employee not found")
+    document_not_modified(request, response, employee)
     # Handle missing created_at field for existing data
     if "created_at" not in employee:
         employee["created_at"] = None
@@ -33,20 +254,21 @@ async def get_employee(employee_id: str, request: Request):
 async def create_employee(employee: EmployeeCreate, request: Request):
     db = request.app.mongodb["employees"]
     employee_data = employee.model_dump()
-    employee_data["created_at"] = datetime.utcnow()
+    employee_data["created_at"] = employee_data["updated_at"] = datetime.utcnow()
+    employee_data["_rev"] = 1
     
     result = await db.insert_one(employee_data)
     employee_data["id"] = str(result.inserted_id)
+    await bump_revision(request.app.mongodb, "employees")
     
-    # Audit log (optional)
+    # Analytics rollup (optional - reconciliation corrects any drift)
     try:
-        await request.app.mongodb["audit_logs"].insert_one({
-            "action": "create_employee",
-            "employee_id": str(result.inserted_id),
-            "timestamp": datetime.utcnow()
-        })
+        await apply_employee_change(request.app.mongodb, after=employee_data)
     except:
-        pass  # Skip audit log if it fails
+        pass
+    
+    # Audit log (write-behind)
+    request.app.audit_logger.log("create_employee", employee_id=str(result.inserted_id))
     
     return EmployeeOut(**employee_data)
 
@@ -58,44 +280,45 @@ async def update_employee(employee_id: str, employee: EmployeeUpdate, request: R
     if not update_data:
         raise HTTPException(status_code=400, detail="No fields to update")
     
-    result = await db.update_one(
+    previous = await db.find_one_and_update(
         {"_id": ObjectId(employee_id)},
-        {"$set": update_data}
+        revision_update(update_data),
+        return_document=ReturnDocument.BEFORE
     )
     
-    if result.matched_count == 0:
+    if previous is None:
         raise HTTPException(status_code=404, detail="Employee not found")
+    await bump_revision(request.app.mongodb, "employees")
+    updated_employee = {**previous, **update_data}
     
-    # Audit log (optional)
+    # Analytics rollup (optional - reconciliation corrects any drift)
     try:
-        await request.app.mongodb["audit_logs"].insert_one({
-            "action": "update_employee",
-            "employee_id": employee_id,
-            "timestamp": datetime.utcnow()
-        })
+        await apply_employee_change(request.app.mongodb, before=previous, after=updated_employee)
     except:
-        pass  # Skip audit log if it fails
+        pass
+    
+    # Audit log (write-behind)
+    request.app.audit_logger.log("update_employee", employee_id=employee_id)
     
     # Return updated employee
-    updated_employee = await db.find_one({"_id": ObjectId(employee_id)})
     return EmployeeOut(id=str(updated_employee["_id"]), **updated_employee)
 
 @router.delete("/{employee_id}")
 async def delete_employee(employee_id: str, request: Request):
     db = request.app.mongodb["employees"]
-    result = await db.delete_one({"_id": ObjectId(employee_id)})
+    deleted = await db.find_one_and_delete({"_id": ObjectId(employee_id)})
     
-    if result.deleted_count == 0:
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Employee not found")
+    await bump_revision(request.app.mongodb, "employees")
     
-    # Audit log (optional)
+    # Analytics rollup (optional - reconciliation corrects any drift)
     try:
-        await request.app.mongodb["audit_logs"].insert_one({
-            "action": "delete_employee",
-            "employee_id": employee_id,
-            "timestamp": datetime.utcnow()
-        })
+        await apply_employee_change(request.app.mongodb, before=deleted)
     except:
-        pass  # Skip audit log if it fails
+        pass
+    
+    # Audit log (write-behind)
+    request.app.audit_logger.log("delete_employee", employee_id=employee_id)
     
     return {"message": "Employee deleted successfully"} 
\ No newline at end of file
@@ -0,0 +1 @@
+# Export package 
\ No newline at end of file
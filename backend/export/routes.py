@@ -0,0 +1,97 @@
+from fastapi import APIRouter, Request
+from core.export import BATCH_SIZE, streaming_export
+from analytics.rollups import DISTRIBUTIONS, load_rollup
+from optimization.telemetry import TELEMETRY_COLLECTION
+import json
+
+router = APIRouter()
+
+EMPLOYEE_COLUMNS = [
+    ("id", "string"), ("name", "string"), ("email", "string"), ("skills", "string"),
+    ("gender", "string"), ("department", "string"), ("created_at", "timestamp"),
+]
+
+PROJECT_COLUMNS = [
+    ("id", "string"), ("name", "string"), ("description", "string"),
+    ("required_roles", "string"), ("constraints", "string"), ("created_at", "timestamp"),
+]
+
+ROLLUP_COLUMNS = [("dimension", "string"), ("key", "string"), ("count", "int")]
+
+OPTIMIZATION_RUN_COLUMNS = [
+    ("id", "string"), ("project_id", "string"), ("timestamp", "timestamp"), ("success", "bool"),
+    ("candidate_count", "int"), ("best_score", "float"), ("constraint_satisfaction", "float"),
+    ("diversity", "float"), ("fetch_ms", "float"), ("optimize_ms", "float"), ("total_ms", "float"),
+]
+
+def _cursor(request: Request, collection: str, fields):
+    projection = {name: 1 for name, _ in fields if name != "id"}
+    return request.app.mongodb[collection].find({}, projection).sort("_id", 1).batch_size(BATCH_SIZE)
+
+async def _employee_rows(request: Request):
+    async for emp in _cursor(request, "employees", EMPLOYEE_COLUMNS):
+        yield {
+            "id": str(emp["_id"]),
+            "name": emp.get("name"),
+            "email": emp.get("email"),
+            "skills": json.dumps(emp.get("skills", [])),
+            "gender": emp.get("gender"),
+            "department": emp.get("department"),
+            "created_at": emp.get("created_at"),
+        }
+
+async def _project_rows(request: Request):
+    async for proj in _cursor(request, "projects", PROJECT_COLUMNS):
+        yield {
+            "id": str(proj["_id"]),
+            "name": proj.get("name"),
+            "description": proj.get("description"),
+            "required_roles": json.dumps(proj.get("required_roles", [])),
+            "constraints": proj.get("constraints"),
+            "created_at": proj.get("created_at"),
+        }
+
+async def _rollup_rows(request: Request):
+    stats = await load_rollup(request.app.mongodb)
+    yield {"dimension": "total", "key": "employees", "count": stats["total_employees"]}
+    for dimension in DISTRIBUTIONS:
+        for key, count in sorted(stats[dimension].items()):
+            yield {"dimension": dimension, "key": key, "count": count}
+
+async def _optimization_run_rows(request: Request):
+    cursor = request.app.mongodb[TELEMETRY_COLLECTION].find().sort("_id", 1).batch_size(BATCH_SIZE)
+    async for run in cursor:
+        stages = run.get("stages_ms", {})
+        yield {
+            "id": str(run["_id"]),
+            "project_id": run.get("project_id"),
+            "timestamp": run.get("timestamp"),
+            "success": run.get("success"),
+            "candidate_count": run.get("candidate_count"),
+            "best_score": run.get("best_score"),
+            "constraint_satisfaction": run.get("constraint_satisfaction"),
+            "diversity": run.get("diversity"),
+            "fetch_ms": stages.get("fetch"),
+            "optimize_ms": stages.get("optimize"),
+            "total_ms": stages.get("total"),
+        }
+
+@router.get("/employees")
+async def export_employees(request: Request, format: str = "ndjson"):
+    """Stream every employee as NDJSON, CSV, Arrow or Parquet"""
+    return streaming_export(_employee_rows(request), EMPLOYEE_COLUMNS, format, "employees")
+
+@router.get("/projects")
+async def export_projects(request: Request, format: str = "ndjson"):
+    """Stream every project as NDJSON, CSV, Arrow or Parquet"""
+    return streaming_export(_project_rows(request), PROJECT_COLUMNS, format, "projects")
+
+@router.get("/analytics")
+async def export_analytics_rollups(request: Request, format: str = "ndjson"):
+    """Stream the org-wide analytics rollup as (dimension, key, count) rows"""
+    return streaming_export(_rollup_rows(request), ROLLUP_COLUMNS, format, "analytics_rollups")
+
+@router.get("/optimization-runs")
+async def export_optimization_runs(request: Request, format: str = "ndjson"):
+    """Stream the recorded optimization runs (telemetry records)"""
+    return streaming_export(_optimization_run_rows(request), OPTIMIZATION_RUN_COLUMNS, format, "optimization_runs")
@@ -1,6 +1,19 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from core.admission import admission, controller_from_env
+from core.audit import AuditLogger
+from core.indexes import ensure_indexes
+from core.periodic import start_once, start_periodic, stop_periodic
+from core.singleflight import SingleFlight
+from optimization.recorder import drain_snapshots
+from optimization.telemetry import TelemetryWriter
+from collaboration.broker import create_broker
+from collaboration.counters import RECONCILE_INTERVAL_SECONDS as COUNTER_RECONCILE_SECONDS, reconcile_counters
+from collaboration.stats import RECONCILE_INTERVAL_SECONDS as STATS_RECONCILE_SECONDS, reconcile_stats
+from collaboration.notifier import Notifier
+from collaboration.threads import backfill_comment_roots
+from analytics.rollups import RECONCILE_INTERVAL_SECONDS, reconcile_rollups
 import os
 from dotenv import load_dotenv
 
@@ -17,8 +30,24 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Last-Modified", "Retry-After"],
 )
 
+# Write-behind audit log and notification queue shared by all routers
+app.audit_logger = AuditLogger()
+# Notification push: in-process, or across workers via Redis if NOTIFICATION_BROKER_URL is set
+app.broker = create_broker(os.getenv("NOTIFICATION_BROKER_URL"))
+app.notifier = Notifier(app.broker)
+# Write-behind optimization run telemetry
+app.telemetry = TelemetryWriter()
+# Coalesces identical concurrent optimize/summary requests
+app.singleflight = SingleFlight()
+# Concurrency limits and priority queues for the CPU-heavy routers
+app.admission = {
+    "optimize": controller_from_env("optimize", limit=2),
+    "analytics": controller_from_env("analytics", limit=4),
+}
+
 # MongoDB connection
 @app.on_event("startup")
 async def startup_db_client():
@@ -27,45 +56,90 @@ async def startup_db_client():
         raise RuntimeError("MONGODB_URL environment variable not set!")
     app.mongodb_client = AsyncIOMotorClient(mongodb_url)
     app.mongodb = app.mongodb_client.team_optimizer
+    app.audit_logger.start(app.mongodb)
+    await app.broker.start()
+    app.notifier.start(app.mongodb)
+    app.telemetry.start(app.mongodb)
+    
+    # Indexes declared by each module's indexes.py
+    await ensure_indexes(app.mongodb)
+    
+    # Give comments written before thread roots were recorded their root
+    start_once(app, backfill_comment_roots, app.mongodb)
+    
+    # Periodically correct drift in the incrementally maintained analytics rollup
+    start_periodic(app, RECONCILE_INTERVAL_SECONDS, reconcile_rollups, app.mongodb)
+    # ...and in the per-user unread notification counters
+    start_periodic(app, COUNTER_RECONCILE_SECONDS, reconcile_counters, app.mongodb)
+    # ...and in the per-project collaboration aggregates
+    start_periodic(app, STATS_RECONCILE_SECONDS, reconcile_stats, app.mongodb)
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await stop_periodic(app)
+    # Drain queued audit events and notifications before the client goes away
+    await app.audit_logger.stop()
+    await app.notifier.stop()
+    await app.telemetry.stop()
+    await drain_snapshots()
+    await app.broker.stop()
     app.mongodb_client.close()
+    if hashing is not None:
+        hashing.shutdown()
+
+# Opt-in bearer-token protection for every router except login/registration
+REQUIRE_AUTH = os.getenv("REQUIRE_AUTH", "false").lower() in ("1", "true", "yes")
+protected = []
 
 # Include routers
 try:
-    from auth.routes import router as auth_router
+    from auth.routes import audit_router, router as auth_router
+    from auth import hashing, tokens
+    from auth.dependencies import get_current_user, stats as user_cache_stats
+    if REQUIRE_AUTH:
+        protected = [Depends(get_current_user)]
     app.include_router(auth_router, prefix="/auth", tags=["Authentication"])
+    app.include_router(audit_router, prefix="/auth", tags=["Authentication"], dependencies=protected)
 except ImportError:
-    pass
+    hashing = tokens = None
+    if REQUIRE_AUTH:
+        raise
 
 try:
     from employees.routes import router as employees_router
-    app.include_router(employees_router, prefix="/employees", tags=["Employees"])
+    app.include_router(employees_router, prefix="/employees", tags=["Employees"], dependencies=protected)
 except ImportError:
     pass
 
 try:
     from projects.routes import router as projects_router
-    app.include_router(projects_router, prefix="/projects", tags=["Projects"])
+    app.include_router(projects_router, prefix="/projects", tags=["Projects"], dependencies=protected)
 except ImportError:
     pass
 
 try:
     from optimization.routes_simple import router as optimization_router
-    app.include_router(optimization_router, prefix="/optimize", tags=["Optimization"])
+    app.include_router(optimization_router, prefix="/optimize", tags=["Optimization"],
+                       dependencies=protected + [Depends(admission(app.admission["optimize"]))])
 except ImportError:
     pass
 
 try:
     from analytics.routes import router as analytics_router
-    app.include_router(analytics_router, prefix="/analytics", tags=["Analytics"])
+    app.include_router(analytics_router, prefix="/analytics", tags=["Analytics"],
+                       dependencies=protected + [Depends(admission(app.admission["analytics"]))])
 except ImportError:
     pass
 
 try:
     from collaboration.routes import router as collaboration_router
-    app.include_router(collaboration_router, prefix="/collaboration", tags=["Collaboration"])
+    app.include_router(collaboration_router, prefix="/collaboration", tags=["Collaboration"], dependencies=protected)
+except ImportError:
+    pass
+
+try:
+    from export.routes import router as export_router
+    app.include_router(export_router, prefix="/export", tags=["Export"], dependencies=protected)
 except ImportError:
     pass
 
@@ -73,6 +147,20 @@ except ImportError:
 async def root():
     return {"message": "TeamOptimizer API is running"}
 
+@app.get("/metrics", dependencies=protected)
+async def metrics():
+    return {
+        "audit_log": app.audit_logger.stats(),
+        "notifications": app.notifier.stats(),
+        "telemetry": app.telemetry.stats(),
+        "notification_broker": app.broker.stats(),
+        "singleflight": app.singleflight.stats(),
+        "admission": {name: controller.stats() for name, controller in app.admission.items()},
+        "password_hashing": hashing.stats() if hashing is not None else None,
+        "token_cache": tokens.stats() if tokens is not None else None,
+        "user_cache": user_cache_stats() if tokens is not None else None,
+    }
+
 @app.get("/test")
 async def test():
     return {"message": "Test endpoint working", "status": "ok"} 
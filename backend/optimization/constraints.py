@@ -0,0 +1,59 @@
+import re
+
+def parse_constraints(constraints):
+    # Supports: 'at least 2 juniors', 'max 1 senior', 'must have devops', 'prefer 2 females'
+    result = {"at_least": {}, "max": {}, "must_have": set(), "prefer": {}}
+    if not constraints:
+        return result
+    for part in constraints.split(","):
+        part = part.strip().lower()
+        if part.startswith("at least"):
+            m = re.match(r"at least (\d+) (\w+)", part)
+            if m:
+                count, key = m.groups()
+                result["at_least"][key] = int(count)
+        elif part.startswith("max"):
+            m = re.match(r"max (\d+) (\w+)", part)
+            if m:
+                count, key = m.groups()
+                result["max"][key] = int(count)
+        elif part.startswith("must have"):
+            m = re.match(r"must have (.+)", part)
+            if m:
+                key = m.group(1).strip()
+                result["must_have"].add(key)
+        elif part.startswith("prefer"):
+            m = re.match(r"prefer (\d+) (\w+)", part)
+            if m:
+                count, key = m.groups()
+                result["prefer"][key] = int(count)
+    return result
+
+def _singular(key):
+    # 'juniors' -> 'junior', 'females' -> 'female'
+    return key[:-1] if key.endswith("s") else key
+
+def constraint_satisfaction(team, constraints):
+    """Fraction of parsed constraints a formed team satisfies (1.0 if none)"""
+    counts = {}
+    team_skills = set()
+    for member in team:
+        gender = (member.get("gender") or "other").strip().lower()
+        counts[gender] = counts.get(gender, 0) + 1
+        for skill in member.get("skills", []):
+            level = (skill.get("level") or "").strip().lower()
+            if level:
+                counts[level] = counts.get(level, 0) + 1
+            team_skills.add(skill.get("name", "").strip().lower())
+    
+    checks = []
+    checks += [counts.get(_singular(k), 0) >= v for k, v in constraints["at_least"].items()]
+    checks += [counts.get(_singular(k), 0) <= v for k, v in constraints["max"].items()]
+    checks += [counts.get(_singular(k), 0) >= v for k, v in constraints["prefer"].items()]
+    checks += [must in team_skills for must in constraints["must_have"]]
+    return sum(checks) / len(checks) if checks else 1.0
+
+def gender_diversity(team):
+    """Distinct genders over members with a known gender (0.0 if none)"""
+    genders = [m.get("gender").strip().lower() for m in team if m.get("gender")]
+    return len(set(genders)) / len(genders) if genders else 0.0
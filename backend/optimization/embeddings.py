@@ -0,0 +1,60 @@
+import os
+import threading
+from typing import Dict, List
+
+import numpy as np
+
+from core.cache import TTLCache
+
+MODEL_NAME = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+
+# Added to every employee's skills to improve matching against role names
+GENERIC_SKILLS = ["programming", "development", "software", "technical"]
+
+# Normalised embeddings keyed by text, shared by the optimizer and analytics.
+# encode() runs in worker threads, so every cache access holds _cache_lock.
+_cache = TTLCache(maxsize=int(os.getenv("EMBEDDING_CACHE_SIZE", "50000")), ttl=float("inf"))
+_cache_lock = threading.Lock()
+_model = None
+_model_lock = threading.Lock()
+
+def get_model():
+    """Load the SBERT model once; raises RuntimeError if it is not installed"""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                try:
+                    from sentence_transformers import SentenceTransformer
+                except ImportError:
+                    raise RuntimeError("sentence-transformers is not installed")
+                _model = SentenceTransformer(MODEL_NAME)
+    return _model
+
+def is_loaded() -> bool:
+    return _model is not None
+
+def employee_skill_text(emp: Dict) -> str:
+    """Text an employee is embedded as"""
+    skills = [s.get("name", "") for s in emp.get("skills", [])]
+    return ", ".join(skills + GENERIC_SKILLS)
+
+def encode(texts: List[str]) -> np.ndarray:
+    """Unit-normalised embeddings (one row per text), encoding only cache misses.
+
+    Rows are normalised, so a matrix product of two results is a matrix of
+    cosine similarities.
+    """
+    with _cache_lock:
+        rows = [_cache.get(text) for text in texts]
+    missing = list({text for text, row in zip(texts, rows) if row is None})
+    if missing:
+        encoded = get_model().encode(missing, normalize_embeddings=True, convert_to_numpy=True)
+        fresh = dict(zip(missing, encoded))
+        with _cache_lock:
+            for text, vector in fresh.items():
+                _cache.set(text, vector)
+        rows = [fresh[text] if row is None else row for text, row in zip(texts, rows)]
+    if not rows:
+        return np.zeros((0, 0), dtype=np.float32)
+    return np.vstack(rows)
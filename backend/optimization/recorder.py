@@ -0,0 +1,81 @@
+import asyncio
+import gzip
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Iterator, List
+
+# Employee fields the optimizer actually reads; also what a snapshot stores
+EMPLOYEE_PROJECTION = {"name": 1, "skills": 1, "gender": 1, "department": 1}
+
+# Opt-in: snapshots are only written when this points at a file
+SNAPSHOT_PATH = os.getenv("OPTIMIZATION_SNAPSHOT_PATH")
+
+logger = logging.getLogger(__name__)
+
+_write_lock = threading.Lock()
+# Writes still in progress, kept referenced until done and drained on shutdown
+_pending = set()
+
+def build_snapshot(project: Dict, employees: List[Dict], seed: int) -> Dict:
+    """Build a compact, JSON-serialisable snapshot of one optimize input"""
+    return {
+        "recorded_at": datetime.utcnow().isoformat(),
+        "project_id": str(project.get("_id", "")),
+        "project": {
+            "name": project.get("name"),
+            "required_roles": project.get("required_roles", []),
+            "constraints": project.get("constraints"),
+        },
+        "employees": [
+            {"_id": str(emp.get("_id", "")), **{k: emp.get(k) for k in EMPLOYEE_PROJECTION}}
+            for emp in employees
+        ],
+        "seed": seed,
+    }
+
+def _append(path: str, line: str):
+    # Appending to a gzip file adds a new member; readers see one stream
+    with _write_lock, gzip.open(path, "at", encoding="utf-8") as fh:
+        fh.write(line + "\n")
+
+def _written(task: asyncio.Task):
+    _pending.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Failed to record optimization snapshot", exc_info=task.exception())
+
+def record_snapshot(project: Dict, employees: List[Dict], seed: int, path: str = None):
+    """Append a snapshot to the configured file in the background, if recording is enabled.
+
+    The request never waits on the file; recording must never fail an
+    optimize request.
+    """
+    path = path or SNAPSHOT_PATH
+    if not path:
+        return
+    try:
+        line = json.dumps(build_snapshot(project, employees, seed), default=str)
+    except Exception:
+        logger.exception("Failed to serialise optimization snapshot")
+        return
+    task = asyncio.create_task(asyncio.to_thread(_append, path, line))
+    _pending.add(task)
+    task.add_done_callback(_written)
+
+async def drain_snapshots():
+    """Wait for snapshot writes still in progress (called on shutdown)"""
+    if _pending:
+        await asyncio.gather(*_pending, return_exceptions=True)
+
+def load_snapshots(path: str) -> Iterator[Dict]:
+    """Yield snapshots from a gzip-compressed (or plain) JSON-lines file"""
+    with open(path, "rb") as raw:
+        compressed = raw.read(2) == b"\x1f\x8b"
+    opener = gzip.open if compressed else open
+    with opener(path, "rt", encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
@@ -0,0 +1,76 @@
+"""Replay recorded optimize snapshots through the optimizer.
+
+Usage (from the backend directory):
+
+    python -m optimization.replay snapshots.jsonl.gz --profiler cprofile
+    python -m optimization.replay snapshots.jsonl.gz --profiler pyinstrument
+
+Each snapshot is replayed with its recorded seed, so results are
+reproducible and slow cases can be kept around as benchmark fixtures.
+"""
+import argparse
+import cProfile
+import pstats
+import random
+import sys
+import time
+
+from .recorder import load_snapshots
+from .routes_simple import run_optimization
+
+def replay_snapshot(snapshot, repeat=1):
+    """Run one snapshot through the optimizer, returning (result, seconds)"""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = run_optimization(
+            snapshot["project"], snapshot["employees"], random.Random(snapshot["seed"])
+        )
+    return result, (time.perf_counter() - started) / repeat
+
+def _replay_all(snapshots, repeat):
+    for index, snapshot in enumerate(snapshots):
+        result, seconds = replay_snapshot(snapshot, repeat)
+        print(
+            f"[{index}] project={snapshot.get('project_id')} "
+            f"employees={len(snapshot['employees'])} seed={snapshot['seed']} "
+            f"score={result.overall_score:.4f} time={seconds * 1000:.2f}ms"
+        )
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay recorded optimization snapshots")
+    parser.add_argument("path", help="Snapshot file written via OPTIMIZATION_SNAPSHOT_PATH")
+    parser.add_argument("--profiler", choices=["none", "cprofile", "pyinstrument"], default="none")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per snapshot")
+    parser.add_argument("--sort", default="cumulative", help="cProfile sort key")
+    parser.add_argument("--limit", type=int, default=30, help="cProfile rows to print")
+    parser.add_argument("--output", help="Write raw cProfile stats to this file")
+    args = parser.parse_args(argv)
+
+    snapshots = list(load_snapshots(args.path))
+    if not snapshots:
+        print("No snapshots found", file=sys.stderr)
+        return 1
+
+    if args.profiler == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.runcall(_replay_all, snapshots, args.repeat)
+        if args.output:
+            profiler.dump_stats(args.output)
+        pstats.Stats(profiler).sort_stats(args.sort).print_stats(args.limit)
+    elif args.profiler == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            print("pyinstrument is not installed (pip install pyinstrument)", file=sys.stderr)
+            return 1
+        profiler = Profiler()
+        profiler.start()
+        _replay_all(snapshots, args.repeat)
+        profiler.stop()
+        print(profiler.output_text(unicode=True, color=False))
+    else:
+        _replay_all(snapshots, args.repeat)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
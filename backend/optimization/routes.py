@@ -3,19 +3,17 @@ from .models import (
     OptimizationRequest, AdvancedOptimizationResult, TeamMember, Skill,
     WorkloadMetrics, ChemistryMetrics
 )
+from .constraints import parse_constraints
 from datetime import datetime
 from bson import ObjectId
 import re
-from sentence_transformers import SentenceTransformer, util
+from .embeddings import employee_skill_text, encode
 import numpy as np
 import itertools
 import random
 
 router = APIRouter()
 
-# SBERT model (load once)
-model = SentenceTransformer('all-MiniLM-L6-v2')
-
 LEVEL_RANK = {"senior": 3, "mid": 2, "junior": 1, None: 0, "": 0}
 def skill_level_rank(level):
     if not level:
@@ -142,35 +140,6 @@ def generate_recommendations(workload_metrics, chemistry_metrics, team):
     
     return recommendations
 
-def parse_constraints(constraints):
-    # Supports: 'at least 2 juniors', 'max 1 senior', 'must have devops', 'prefer 2 females'
-    result = {"at_least": {}, "max": {}, "must_have": set(), "prefer": {}}
-    if not constraints:
-        return result
-    for part in constraints.split(","):
-        part = part.strip().lower()
-        if part.startswith("at least"):
-            m = re.match(r"at least (\d+) (\w+)", part)
-            if m:
-                count, key = m.groups()
-                result["at_least"][key] = int(count)
-        elif part.startswith("max"):
-            m = re.match(r"max (\d+) (\w+)", part)
-            if m:
-                count, key = m.groups()
-                result["max"][key] = int(count)
-        elif part.startswith("must have"):
-            m = re.match(r"must have (.+)", part)
-            if m:
-                key = m.group(1).strip()
-                result["must_have"].add(key)
-        elif part.startswith("prefer"):
-            m = re.match(r"prefer (\d+) (\w+)", part)
-            if m:
-                count, key = m.groups()
-                result["prefer"][key] = int(count)
-    return result
-
 @router.post("/{project_id}", response_model=AdvancedOptimizationResult)
 async def optimize(project_id: str, request: Request):
     db_projects = request.app.mongodb["projects"]
@@ -188,18 +157,12 @@ async def optimize(project_id: str, request: Request):
     employees = await db_employees.find().to_list(1000)
     
     # Prepare SBERT embeddings for more flexible skill matching
-    role_embeddings = model.encode(required_roles)
-    employee_skill_texts = []
-    for emp in employees:
-        skills = [s.get("name", "") for s in emp.get("skills", [])]
-        # Add some generic skills to improve matching
-        generic_skills = ["programming", "development", "software", "technical"]
-        all_skills = skills + generic_skills
-        employee_skill_texts.append(", ".join(all_skills))
-    employee_embeddings = model.encode(employee_skill_texts)
-    
-    # Compute similarity matrix (roles x employees)
-    sim_matrix = util.cos_sim(role_embeddings, employee_embeddings).cpu().numpy()
+    # SBERT embeddings (cached per text) for more flexible skill matching
+    role_embeddings = encode(required_roles)
+    employee_embeddings = encode([employee_skill_text(emp) for emp in employees])
+    
+    # Compute similarity matrix (roles x employees); rows are normalised
+    sim_matrix = role_embeddings @ employee_embeddings.T
     
     num_roles = len(required_roles)
     num_emps = len(employees)
@@ -327,16 +290,8 @@ async def optimize(project_id: str, request: Request):
     chemistry_bonus = chemistry_metrics.overall_chemistry * 0.3
     overall_score = min(1.0, base_score + workload_bonus + chemistry_bonus)
     
-    # Audit log (optional)
-    try:
-        await request.app.mongodb["audit_logs"].insert_one({
-            "action": "optimize", 
-            "project_id": project_id, 
-            "timestamp": datetime.utcnow(),
-            "advanced_features": True
-        })
-    except:
-        pass  # Skip audit log if it fails
+    # Audit log (write-behind)
+    request.app.audit_logger.log("optimize", project_id=project_id, advanced_features=True)
     
     return AdvancedOptimizationResult(
         teams=teams,
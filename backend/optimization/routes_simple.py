@@ -3,13 +3,22 @@ from .models import (
     OptimizationRequest, AdvancedOptimizationResult, TeamMember, Skill,
     WorkloadMetrics, ChemistryMetrics
 )
+from .constraints import constraint_satisfaction, gender_diversity, parse_constraints
+from .recorder import EMPLOYEE_PROJECTION, record_snapshot
+from .telemetry import build_record
+from core.admission import detach_admission
+from core.revisions import revision_tag
 from datetime import datetime
 from bson import ObjectId
+import logging
 import re
 import random
+import time
 
 router = APIRouter()
 
+logger = logging.getLogger(__name__)
+
 def calculate_workload_metrics(team, employees_data):
     """Calculate workload distribution and balance metrics"""
     workload_scores = {}
@@ -50,7 +59,7 @@ def calculate_workload_metrics(team, employees_data):
         underutilized_members=underutilized
     )
 
-def calculate_chemistry_metrics(team, employees_data):
+def calculate_chemistry_metrics(team, employees_data, rng=random):
     """Calculate team chemistry and collaboration metrics"""
     if len(team) < 2:
         return ChemistryMetrics(
@@ -62,9 +71,9 @@ def calculate_chemistry_metrics(team, employees_data):
         )
     
     # Simple chemistry calculation
-    communication_score = 0.8 + random.uniform(-0.2, 0.2)
-    collaboration_score = 0.75 + random.uniform(-0.25, 0.25)
-    conflict_risk = random.uniform(0.1, 0.4)
+    communication_score = 0.8 + rng.uniform(-0.2, 0.2)
+    collaboration_score = 0.75 + rng.uniform(-0.25, 0.25)
+    conflict_risk = rng.uniform(0.1, 0.4)
     team_cohesion = (communication_score + collaboration_score) / 2
     overall_chemistry = team_cohesion * (1 - conflict_risk * 0.5)
     
@@ -109,21 +118,14 @@ def generate_recommendations(workload_metrics, chemistry_metrics, team):
     
     return recommendations
 
-@router.post("/{project_id}", response_model=AdvancedOptimizationResult)
-async def optimize(project_id: str, request: Request):
-    db_projects = request.app.mongodb["projects"]
-    db_employees = request.app.mongodb["employees"]
-    
-    # Fetch project
-    project = await db_projects.find_one({"_id": ObjectId(project_id)})
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-    
+def run_optimization(project, employees, rng=random):
+    """Form a team for a project from an employee snapshot.
+
+    Pure with respect to its inputs, so recorded snapshots can be replayed
+    through it deterministically by passing a seeded ``random.Random``.
+    """
     required_roles = [r["role"].strip() for r in project.get("required_roles", []) if r.get("role")]
     
-    # Fetch all employees
-    employees = await db_employees.find().to_list(1000)
-    
     # Simple team formation - assign employees to roles based on availability
     teams = []
     explanations = []
@@ -160,7 +162,7 @@ async def optimize(project_id: str, request: Request):
     
     # Calculate advanced metrics for the team
     workload_metrics = calculate_workload_metrics(team, employees)
-    chemistry_metrics = calculate_chemistry_metrics(team, employees)
+    chemistry_metrics = calculate_chemistry_metrics(team, employees, rng)
     
     # Generate recommendations
     recommendations = generate_recommendations(workload_metrics, chemistry_metrics, team)
@@ -179,4 +181,73 @@ async def optimize(project_id: str, request: Request):
         overall_score=overall_score,
         recommendations=recommendations,
         generated_at=datetime.utcnow()
-    ) 
\ No newline at end of file
+    )
+
+def _record_telemetry(request: Request, project_id: str, stages_ms, project=None, result=None):
+    """Queue a telemetry record for one run (write-behind - never fails the request)"""
+    try:
+        if result is None:
+            record = build_record(project_id, False, stages_ms)
+        else:
+            best_team = result.teams[0] if result.teams else []
+            members = [m.model_dump() for m in best_team]
+            record = build_record(
+                project_id,
+                bool(best_team),
+                stages_ms,
+                candidate_count=len(result.teams),
+                best_score=result.overall_score,
+                constraint_satisfaction=constraint_satisfaction(members, parse_constraints(project.get("constraints"))),
+                diversity=gender_diversity(members)
+            )
+        request.app.telemetry.submit(record)
+    except Exception:
+        logger.exception("Failed to record optimization telemetry for project %s", project_id)
+
+@router.post("/{project_id}", response_model=AdvancedOptimizationResult)
+async def optimize(project_id: str, request: Request):
+    """Optimize a project's team; identical concurrent requests share one run"""
+    revisions = await revision_tag(request.app.mongodb, "projects", "employees")
+    # Requests that join a running optimization give their admission slot back;
+    # the one that starts it holds its slot until the run ends, even if it disconnects
+    slot = detach_admission(request)
+    return await request.app.singleflight.do(
+        ("optimize", project_id, revisions), _optimize, project_id, request,
+        on_coalesce=slot.release, on_finish=slot.release
+    )
+
+async def _optimize(project_id: str, request: Request):
+    db_projects = request.app.mongodb["projects"]
+    db_employees = request.app.mongodb["employees"]
+    started = time.perf_counter()
+    
+    # Fetch project
+    project = await db_projects.find_one({"_id": ObjectId(project_id)})
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    # Fetch all employees (only the fields the optimizer reads)
+    employees = await db_employees.find({}, EMPLOYEE_PROJECTION).to_list(1000)
+    fetched = time.perf_counter()
+    
+    # Record the exact inputs when snapshot recording is enabled
+    seed = random.randrange(2 ** 32)
+    record_snapshot(project, employees, seed)
+    
+    try:
+        result = run_optimization(project, employees, random.Random(seed))
+    except Exception:
+        _record_telemetry(request, project_id, {
+            "fetch": (fetched - started) * 1000,
+            "total": (time.perf_counter() - started) * 1000
+        })
+        raise
+    optimized = time.perf_counter()
+    
+    _record_telemetry(request, project_id, {
+        "fetch": (fetched - started) * 1000,
+        "optimize": (optimized - fetched) * 1000,
+        "total": (optimized - started) * 1000
+    }, project, result)
+    
+    return result
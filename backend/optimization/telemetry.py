@@ -0,0 +1,120 @@
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from pymongo import UpdateOne
+
+from core.batch_writer import BatchWriter
+
+TELEMETRY_COLLECTION = "optimization_telemetry"
+BUCKETS_COLLECTION = "optimization_telemetry_buckets"
+
+# Selectable /analytics/performance windows; None means all time
+WINDOWS = {
+    "1h": timedelta(hours=1),
+    "24h": timedelta(hours=24),
+    "7d": timedelta(days=7),
+    "30d": timedelta(days=30),
+    "all": None,
+}
+
+def _hour_id(ts: datetime) -> str:
+    return f"hour:{ts:%Y-%m-%dT%H}"
+
+def _day_id(ts: datetime) -> str:
+    return f"day:{ts:%Y-%m-%d}"
+
+def build_record(project_id: str, success: bool, stages_ms: Dict[str, float], candidate_count: int = 0,
+                 best_score: float = 0.0, constraint_satisfaction: float = 0.0, diversity: float = 0.0) -> Dict:
+    """Compact telemetry record for one optimize run"""
+    return {
+        "project_id": project_id,
+        "timestamp": datetime.utcnow(),
+        "success": success,
+        "stages_ms": {k: round(v, 3) for k, v in stages_ms.items()},
+        "candidate_count": candidate_count,
+        "best_score": best_score,
+        "constraint_satisfaction": constraint_satisfaction,
+        "diversity": diversity,
+    }
+
+def bucket_increments(record: Dict) -> Dict[str, float]:
+    increments = {"runs": 1}
+    if record["success"]:
+        increments.update({
+            "successful": 1,
+            "score_sum": record["best_score"],
+            "constraint_sum": record["constraint_satisfaction"],
+            "diversity_sum": record["diversity"],
+            "candidates_sum": record["candidate_count"],
+        })
+    # Stages are only timed when reached, so each has its own run count
+    for stage, ms in record["stages_ms"].items():
+        increments[f"latency_ms_sum.{stage}"] = ms
+        increments[f"stage_counts.{stage}"] = 1
+    return increments
+
+def _bucket_ids(ts: datetime) -> List[str]:
+    return [_hour_id(ts), _day_id(ts), "all"]
+
+async def roll_up_batch(db, records: List[Dict]):
+    """Fold already-stored run records into their buckets with one bulk write"""
+    totals = {}
+    for record in records:
+        for bucket_id in _bucket_ids(record["timestamp"]):
+            bucket = totals.setdefault(bucket_id, {})
+            for key, value in bucket_increments(record).items():
+                bucket[key] = bucket.get(key, 0) + value
+    if totals:
+        await db[BUCKETS_COLLECTION].bulk_write(
+            [UpdateOne({"_id": bucket_id}, {"$inc": inc}, upsert=True) for bucket_id, inc in totals.items()],
+            ordered=False
+        )
+
+class TelemetryWriter(BatchWriter):
+    """Write-behind telemetry: runs are inserted and rolled up in batches off the request path"""
+
+    def __init__(self):
+        super().__init__(
+            TELEMETRY_COLLECTION,
+            max_batch=int(os.getenv("TELEMETRY_BATCH_SIZE", "500")),
+            flush_interval=float(os.getenv("TELEMETRY_FLUSH_SECONDS", "1.0")),
+            max_queue=int(os.getenv("TELEMETRY_QUEUE_SIZE", "10000")),
+            on_flush=roll_up_batch,
+        )
+
+def window_bucket_ids(window: str, now: datetime = None) -> List[str]:
+    """Bucket ids covering a window, rounded out to whole buckets (at most 31).
+
+    The current bucket is partial, so one more bucket than the span holds
+    is needed to reach back a full window: at 10:05, "1h" is the 09:00
+    and 10:00 buckets.
+    """
+    span = WINDOWS[window]
+    if span is None:
+        return ["all"]
+    now = now or datetime.utcnow()
+    if span <= timedelta(hours=24):
+        count = int(span / timedelta(hours=1))
+        return [_hour_id(now - timedelta(hours=i)) for i in range(count + 1)]
+    count = int(span / timedelta(days=1))
+    return [_day_id(now - timedelta(days=i)) for i in range(count + 1)]
+
+async def load_window(db, window: str) -> Dict:
+    """Sum the pre-aggregated buckets for a window"""
+    ids = window_bucket_ids(window)
+    totals = {"runs": 0, "successful": 0, "score_sum": 0.0, "constraint_sum": 0.0,
+              "diversity_sum": 0.0, "candidates_sum": 0, "latency_ms_sum": {}, "stage_counts": {}}
+    async for bucket in db[BUCKETS_COLLECTION].find({"_id": {"$in": ids}}):
+        for key in totals:
+            if key == "latency_ms_sum":
+                for stage, ms in (bucket.get(key) or {}).items():
+                    totals[key][stage] = totals[key].get(stage, 0.0) + ms
+            elif key == "stage_counts":
+                # Buckets written before per-stage counts timed every stage on every run
+                counts = bucket.get(key) or {stage: bucket.get("runs", 0) for stage in bucket.get("latency_ms_sum") or {}}
+                for stage, n in counts.items():
+                    totals[key][stage] = totals[key].get(stage, 0) + n
+            else:
+                totals[key] += bucket.get(key, 0)
+    return totals
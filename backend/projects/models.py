@@ -32,4 +32,31 @@ class ProjectOut(BaseModel):
     description: str
     required_roles: List[Role]
     constraints: Optional[str] = None
-    created_at: Optional[datetime] = None 
\ No newline at end of file
+    created_at: Optional[datetime] = None
+
+class ProjectListItem(BaseModel):
+    """Project as returned by the list endpoint, which may project fields"""
+    id: str
+    name: Optional[str] = None
+    description: Optional[str] = None
+    required_roles: Optional[List[Role]] = None
+    constraints: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+class ProjectBulkUpdate(ProjectUpdate):
+    id: str
+
+class BulkDeleteRequest(BaseModel):
+    ids: List[str]
+
+class BulkWriteFailure(BaseModel):
+    id: str
+    error: str
+
+class BulkWriteSummary(BaseModel):
+    matched: int = 0
+    modified: int = 0
+    deleted: int = 0
+    invalid_ids: List[str] = []
+    not_found: List[str] = []
+    failed: List[BulkWriteFailure] = []
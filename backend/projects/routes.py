@@ -1,29 +1,130 @@
-from fastapi import APIRouter, HTTPException, Request
-from .models import ProjectCreate, ProjectUpdate, ProjectOut
+from fastapi import APIRouter, HTTPException, Request, Response
+from .models import (
+    ProjectCreate, ProjectUpdate, ProjectOut, ProjectListItem,
+    ProjectBulkUpdate, BulkDeleteRequest, BulkWriteFailure, BulkWriteSummary
+)
+from core.bulk import parse_object_ids, unordered_bulk_write
+from core.listing import list_page, parse_fields
+from core.pagination import MAX_PAGE_SIZE
+from core.revisions import (
+    REVISION_FIELDS, bump_revision, document_not_modified, list_not_modified, revision_update
+)
 from bson import ObjectId
+from pymongo import DeleteOne, UpdateOne
 from datetime import datetime
-from typing import List
+from typing import List, Optional
+import asyncio
 
 router = APIRouter()
 
-@router.get("/", response_model=List[ProjectOut])
-async def get_projects(request: Request):
+LIST_FIELDS = ["name", "description", "required_roles", "constraints", "created_at"]
+
+@router.get("/", response_model=List[ProjectListItem], response_model_exclude_unset=True)
+async def get_projects(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = MAX_PAGE_SIZE,
+    fields: Optional[str] = None
+):
+    """List projects a page at a time (next page token in X-Next-Cursor)"""
     db = request.app.mongodb["projects"]
-    projects = await db.find().to_list(1000)
+    projection = parse_fields(fields, LIST_FIELDS)
+    not_modified = await list_not_modified(request, response, "projects")
+    if not_modified:
+        return not_modified
+    projects = await list_page(db, {}, projection, cursor, limit, response)
     result = []
     for proj in projects:
-        # Handle missing created_at field for existing data
-        if "created_at" not in proj:
-            proj["created_at"] = None
-        result.append(ProjectOut(id=str(proj["_id"]), **proj))
+        # Every requested field is present, even if missing in older documents
+        values = {f: proj.get(f) for f in (projection or LIST_FIELDS)}
+        result.append(ProjectListItem(id=str(proj["_id"]), **values))
     return result
 
+@router.patch("/bulk", response_model=BulkWriteSummary)
+async def bulk_update_projects(updates: List[ProjectBulkUpdate], request: Request):
+    """Update many projects with one unordered bulk_write"""
+    db = request.app.mongodb["projects"]
+    valid_ids, invalid_ids = parse_object_ids(u.id for u in updates)
+    
+    operations = []
+    updated_ids = []
+    now = datetime.utcnow()
+    for update in updates:
+        if update.id in invalid_ids:
+            continue
+        update_data = {k: v for k, v in update.model_dump(exclude={"id"}).items() if v is not None}
+        if update_data:
+            operations.append(UpdateOne({"_id": ObjectId(update.id)}, revision_update(update_data, now)))
+            updated_ids.append(ObjectId(update.id))
+    
+    summary = BulkWriteSummary(invalid_ids=invalid_ids)
+    if not operations:
+        return summary
+    # Existence check and write run concurrently; both are single round trips
+    existing, (counts, failed) = await asyncio.gather(
+        db.distinct("_id", {"_id": {"$in": valid_ids}}),
+        unordered_bulk_write(db, operations)
+    )
+    summary.matched = counts.get("nMatched", 0)
+    summary.modified = counts.get("nModified", 0)
+    summary.failed = [BulkWriteFailure(id=str(updated_ids[i]), error=msg) for i, msg in sorted(failed.items())]
+    existing = set(existing)
+    summary.not_found = [str(oid) for oid in valid_ids if oid not in existing]
+    applied = [oid for i, oid in enumerate(updated_ids) if i not in failed and oid in existing]
+    if not applied:
+        return summary
+    await bump_revision(request.app.mongodb, "projects")
+    
+    # Audit log (write-behind), for the applied updates only
+    for oid in applied:
+        request.app.audit_logger.log("update_project", project_id=str(oid))
+    
+    return summary
+
+@router.delete("/bulk", response_model=BulkWriteSummary)
+async def bulk_delete_projects(body: BulkDeleteRequest, request: Request):
+    """Delete many projects with one unordered bulk_write"""
+    db = request.app.mongodb["projects"]
+    valid_ids, invalid_ids = parse_object_ids(body.ids)
+    if not valid_ids:
+        return BulkWriteSummary(invalid_ids=invalid_ids)
+    
+    existing = set(await db.distinct("_id", {"_id": {"$in": valid_ids}}))
+    summary = BulkWriteSummary(
+        invalid_ids=invalid_ids,
+        not_found=[str(oid) for oid in valid_ids if oid not in existing]
+    )
+    if not existing:
+        return summary
+    targets = [oid for oid in valid_ids if oid in existing]
+    counts, failed = await unordered_bulk_write(db, [DeleteOne({"_id": oid}) for oid in targets])
+    summary.deleted = counts.get("nRemoved", 0)
+    summary.failed = [BulkWriteFailure(id=str(targets[i]), error=msg) for i, msg in sorted(failed.items())]
+    deleted = [oid for i, oid in enumerate(targets) if i not in failed]
+    if not deleted:
+        return summary
+    await bump_revision(request.app.mongodb, "projects")
+    
+    # Audit log (write-behind), for the applied deletes only
+    for oid in deleted:
+        request.app.audit_logger.log("delete_project", project_id=str(oid))
+    
+    return summary
+
 @router.get("/{project_id}", response_model=ProjectOut)
-async def get_project(project_id: str, request: Request):
+async def get_project(project_id: str, request: Request, response: Response):
     db = request.app.mongodb["projects"]
+    if request.headers.get("if-none-match"):
+        # Revalidation reads only the revision fields
+        revision = await db.find_one({"_id": ObjectId(project_id)}, REVISION_FIELDS)
+        not_modified = document_not_modified(request, response, revision) if revision else None
+        if not_modified:
+            return not_modified
     project = await db.find_one({"_id": ObjectId(project_id)})
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
+    document_not_modified(request, response, project)
     # Handle missing created_at field for existing data
     if "created_at" not in project:
         project["created_at"] = None
@@ -33,20 +134,15 @@ async def get_project(project_id: str, request: Request):
 async def create_project(project: ProjectCreate, request: Request):
     db = request.app.mongodb["projects"]
     project_data = project.model_dump()
-    project_data["created_at"] = datetime.utcnow()
+    project_data["created_at"] = project_data["updated_at"] = datetime.utcnow()
+    project_data["_rev"] = 1
     
     result = await db.insert_one(project_data)
     project_data["id"] = str(result.inserted_id)
+    await bump_revision(request.app.mongodb, "projects")
     
-    # Audit log (optional)
-    try:
-        await request.app.mongodb["audit_logs"].insert_one({
-            "action": "create_project",
-            "project_id": str(result.inserted_id),
-            "timestamp": datetime.utcnow()
-        })
-    except:
-        pass  # Skip audit log if it fails
+    # Audit log (write-behind)
+    request.app.audit_logger.log("create_project", project_id=str(result.inserted_id))
     
     return ProjectOut(**project_data)
 
@@ -60,21 +156,15 @@ async def update_project(project_id: str, project: ProjectUpdate, request: Reque
     
     result = await db.update_one(
         {"_id": ObjectId(project_id)},
-        {"$set": update_data}
+        revision_update(update_data)
     )
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Project not found")
+    await bump_revision(request.app.mongodb, "projects")
     
-    # Audit log (optional)
-    try:
-        await request.app.mongodb["audit_logs"].insert_one({
-            "action": "update_project",
-            "project_id": project_id,
-            "timestamp": datetime.utcnow()
-        })
-    except:
-        pass  # Skip audit log if it fails
+    # Audit log (write-behind)
+    request.app.audit_logger.log("update_project", project_id=project_id)
     
     # Return updated project
     updated_project = await db.find_one({"_id": ObjectId(project_id)})
@@ -87,15 +177,9 @@ async def delete_project(project_id: str, request: Request):
     
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Project not found")
+    await bump_revision(request.app.mongodb, "projects")
     
-    # Audit log (optional)
-    try:
-        await request.app.mongodb["audit_logs"].insert_one({
-            "action": "delete_project",
-            "project_id": project_id,
-            "timestamp": datetime.utcnow()
-        })
-    except:
-        pass  # Skip audit log if it fails
+    # Audit log (write-behind)
+    request.app.audit_logger.log("delete_project", project_id=project_id)
     
     return {"message": "Project deleted successfully"} 
\ No newline at end of file